@@ -0,0 +1,100 @@
+from json import dumps
+from logging import debug, error
+from threading import Condition, Thread
+from time import perf_counter
+from traceback import format_exc
+from typing import Callable, Optional
+from metrics import Metrics
+from persist import WriteTracker
+
+
+# Background writer for 'application_state_data.json': snapshots are taken on the Tk thread after a
+# debounce, serialized & written atomically on a worker thread, bursts coalesce into one write
+class AutosaveService:
+    def __init__(self, root, filepath: str, snapshot: Callable[[], Optional[dict]], delay: int = 2000,
+                 tracker: Optional[WriteTracker] = None) -> None:
+        self.root = root
+        self.filepath = filepath
+        # Builds the state dict on the Tk thread, None when there is nothing to save yet
+        self.snapshot = snapshot
+        # Debounce (ms) between the last change & the snapshot
+        self.delay = delay
+        # Skips snapshots identical to the saved file
+        self.tracker = tracker or WriteTracker()
+        self._job = None
+        # Latest snapshot waiting for the worker, newer ones replace it
+        self._pending = None
+        self._writing = False
+        self._stopped = False
+        self._condition = Condition()
+        # Write counts, coalesced snapshots & write latency
+        self.metrics = Metrics()
+        self._thread = Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    # Note a state change, called on the Tk thread; restarts the debounce
+    def mark_dirty(self) -> None:
+        self.metrics.incr("changes")
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self.metrics.incr("debounced")
+        self._job = self.root.after(self.delay, self._take_snapshot)
+
+    # Snapshot state on the Tk thread & hand it to the worker
+    def _take_snapshot(self) -> None:
+        self._job = None
+        state = self.snapshot()
+        if state is None:
+            return
+        with self._condition:
+            if self._pending is not None:
+                self.metrics.incr("coalesced")
+            self._pending = state
+            self._condition.notify()
+
+    # Worker loop: write the latest pending snapshot
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+                self._writing = True
+
+            start = perf_counter()
+            try:
+                if self.tracker.write(self.filepath, dumps(state)):
+                    self.metrics.incr("writes")
+                    self.metrics.observe("write_ms", (perf_counter() - start) * 1000)
+                    debug(f"Autosaved application state to {self.filepath}")
+                else:
+                    self.metrics.incr("unchanged")
+            except (OSError, IOError) as e:
+                self.metrics.incr("failures")
+                error(f"An exception occurred while autosaving application state: {e}")
+                error(format_exc())
+
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+    # Snapshot now if a change is pending & wait until the worker wrote everything
+    def flush(self, timeout: float = 5.0) -> None:
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._take_snapshot()
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    # Drop the pending debounce & stop the worker once the snapshot it holds is written,
+    # the caller saves the final state itself
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
@@ -0,0 +1,57 @@
+from argparse import ArgumentParser
+from bench_app import bench_batch, bench_engine, bench_startup
+from bench_capture import bench_filter, bench_payload, bench_readers, bench_scheduler, bench_watcher
+from bench_storage import (
+    bench_cold_start, bench_dirty_writes, bench_document, bench_duplicates, bench_history, bench_journal,
+    bench_master_index, bench_stack_persistence, bench_state_size, bench_undo_memory
+)
+from bench_ui import (
+    bench_autosave, bench_coalesce, bench_display, bench_idle_wakeups, bench_topmost, bench_ui_queue, bench_writer
+)
+
+
+# Measurements by name, one module per area: capture path, storage, Tk thread & the whole app;
+# pass/fail checks live in 'tests'
+BENCHMARKS = {
+    "watcher": lambda args: bench_watcher(args.events, args.gap),
+    "scheduler": lambda args: bench_scheduler(args.hours),
+    "readers": lambda args: bench_readers(args.reads),
+    "payload": lambda args: bench_payload(args.polls),
+    "filter": lambda args: bench_filter(args.events),
+    "document": lambda args: bench_document(args.appends),
+    "journal": lambda args: bench_journal(args.appends),
+    "undo-memory": lambda args: bench_undo_memory(args.actions),
+    "history": lambda args: bench_history(args.actions),
+    "stack-persistence": lambda args: bench_stack_persistence(),
+    "autosave": lambda args: bench_autosave(args.events),
+    "cold-start": lambda args: bench_cold_start(args.actions),
+    "dirty-writes": lambda args: bench_dirty_writes(args.events),
+    "ui-queue": lambda args: bench_ui_queue(args.events, args.gap),
+    "idle-wakeups": lambda args: bench_idle_wakeups(),
+    "writer": lambda args: bench_writer(args.appends),
+    "coalesce": lambda args: bench_coalesce(args.events, args.gap),
+    "display": lambda args: bench_display(args.appends),
+    "state-size": lambda args: bench_state_size(args.events),
+    "topmost": lambda args: bench_topmost(args.events),
+    "startup": lambda args: bench_startup(args.runs),
+    "engine": lambda args: bench_engine(args.events),
+    "batch": lambda args: bench_batch(args.events),
+    "master-index": lambda args: bench_master_index(),
+    "duplicates": lambda args: bench_duplicates(),
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Headless benchmarks for the clipboard manager")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--actions", type=int, default=5000, help="Actions in a simulated session")
+    parser.add_argument("--appends", type=int, default=50, help="Appends per file size")
+    parser.add_argument("--polls", type=int, default=200, help="Polls per payload size")
+    parser.add_argument("--reads", type=int, default=1000, help="Clipboard reads per reader")
+    parser.add_argument("--hours", type=float, default=8.0, help="Length of a simulated shift")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per startup measurement")
+    parser.add_argument("--gap", type=float, default=0.0, help="Seconds between synthetic copies")
+    args = parser.parse_args()
+    for key, value in BENCHMARKS[args.benchmark](args).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,154 @@
+from os import chdir, environ, getcwd, listdir, path, remove
+from platform import system
+from shutil import rmtree
+from subprocess import run
+from sys import executable
+from tempfile import mkdtemp
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+from cli import run as run_batch
+from document import ApprovalsDocument
+from engine import Engine, Scheduler
+from journal import journal_path, materialize
+from writer import FileWriter
+
+
+# Modules kept off the startup path, imported on first use
+DEFERRED_IMPORTS = ("screeninfo", "ttkthemes", "PIL", "tkinter.filedialog", "tkinter.messagebox", "ctypes", "watcher", "readers")
+
+
+# Self & cumulative import time (us) per module of a fresh interpreter importing 'module', from '-X importtime'
+def import_times(module: str) -> Tuple[Dict[str, Tuple[int, int]], Optional[str]]:
+    result = run([executable, "-X", "importtime", "-c", f"import {module}"],
+                 cwd=path.dirname(path.abspath(__file__)), capture_output=True, text=True)
+    times = {}
+    failure = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            failure = line
+            continue
+        fields = line[len("import time:"):].split("|")
+        if fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times, failure if result.returncode else None
+
+
+# Time from interpreter start to the first painted window, None without a display
+def first_window_ms() -> Optional[float]:
+    if system() != "Windows" and not environ.get("DISPLAY"):
+        return None
+    code = ("from time import perf_counter; start = perf_counter(); import main; root = main.Tk(); "
+            "root.update(); print((perf_counter() - start) * 1000); root.destroy()")
+    result = run([executable, "-c", code], cwd=path.dirname(path.abspath(__file__)), capture_output=True, text=True)
+    return round(float(result.stdout), 1) if result.returncode == 0 else None
+
+
+# Import cost of 'module' (best of 'runs' fresh interpreters), heaviest imports & whether deferred ones stayed deferred
+def bench_startup(runs: int = 5, module: str = "main", top: int = 10) -> dict:
+    best = None
+    failure = None
+    for _ in range(runs):
+        times, failure = import_times(module)
+        if best is None or times.get(module, (0, 0))[1] < best.get(module, (0, 0))[1]:
+            best = times
+
+    local = {name[:-3] for name in listdir(path.dirname(path.abspath(__file__))) if name.endswith(".py")}
+    results = {"import_ms": round(best.get(module, (0, 0))[1] / 1000, 2), "modules": len(best)}
+    if failure:
+        results["import_error"] = failure
+    results["first_window_ms"] = first_window_ms()
+    for name in DEFERRED_IMPORTS:
+        results[f"{name}_at_startup"] = name in best
+
+    # The app's own modules by cumulative time, everything else by self time
+    for name, (_, cumulative) in sorted(best.items(), key=lambda item: -item[1][1]):
+        if name in local and name != module:
+            results[f"app.{name}_ms"] = round(cumulative / 1000, 2)
+    heaviest = sorted((item for item in best.items() if item[0] not in local), key=lambda item: -item[1][0])
+    for name, (own, _) in heaviest[:top]:
+        results[f"lib.{name}_self_ms"] = round(own / 1000, 2)
+    return results
+
+
+# Headless load test of the core engine: capture, undo, redo, state save & close, no display needed
+def bench_engine(events: int, undos: int = 1000) -> dict:
+    cwd = getcwd()
+    directory = mkdtemp()
+    chdir(directory)
+    scheduler = Scheduler()
+    engine = Engine(scheduler, path.join(directory, "data"), FileWriter())
+    appended = []
+    engine.on("appended", appended.extend)
+    engine.open()
+    results = {}
+
+    start = perf_counter()
+    for i in range(events):
+        # A new master every 10 captures
+        if i % 10 == 0:
+            engine.master_id = f"MASTER{i // 10:06d}"
+        engine.process_master_ids([f"ID{i:08d}"])
+        scheduler.run_due()
+    results["capture_per_sec"] = round(events / (perf_counter() - start))
+
+    undos = min(undos, events)
+    start = perf_counter()
+    for _ in range(undos):
+        engine.undo()
+    results["undo_per_sec"] = round(undos / (perf_counter() - start))
+    start = perf_counter()
+    for _ in range(undos):
+        engine.redo()
+    results["redo_per_sec"] = round(undos / (perf_counter() - start))
+
+    start = perf_counter()
+    engine.save_application_state()
+    results["save_state_ms"] = round((perf_counter() - start) * 1000, 2)
+    start = perf_counter()
+    engine.close()
+    engine.writer.stop()
+    results["close_ms"] = round((perf_counter() - start) * 1000, 2)
+
+    with open(engine.filepath, "r") as file:
+        saved = ApprovalsDocument.parse(file.readlines()).entries("APPROVALS")
+    results["entries_saved"] = len(saved)
+    results["appended_events"] = len(appended)
+    results["unique_masters"] = engine.master_id_counter
+    chdir(cwd)
+    rmtree(directory)
+    return results
+
+
+# Bulk import of 'lines' IDs: one ID at a time with a file rewrite each (the clipboard path) vs. the batch CLI
+def bench_batch(lines: int, sample: int = 1000) -> dict:
+    cwd = getcwd()
+    directory = mkdtemp()
+    chdir(directory)
+    ids = [f"ID{i:08d}" for i in range(lines)]
+    results = {"lines": lines}
+
+    # Old: every ID appended & the approvals file rewritten on its own, timed over 'sample' IDs
+    sample = min(sample, lines)
+    engine = Engine(Scheduler(), path.join(directory, "per-id"))
+    engine.master_id = "MASTER"
+    start = perf_counter()
+    for unique_id in ids[:sample]:
+        engine.process_master_ids([unique_id])
+        materialize(engine)
+    elapsed = perf_counter() - start
+    engine.journal.close()
+    engine.lock.release()
+    results["per_id_sample"] = sample
+    results["per_id_per_sec"] = round(sample / elapsed)
+    results["per_id_capture_sleep_s"] = round(lines * 0.1, 1)
+    remove(engine.filepath)
+    remove(journal_path(engine.filepath))
+
+    # New: one streaming pass through the batch processor
+    stats = run_batch("MASTER", (unique_id + "\n" for unique_id in ids), path.join(directory, "batch"))
+    results["batch_seconds"] = stats["seconds"]
+    results["batch_lines_per_sec"] = stats["lines_per_sec"]
+    results["batch_appended"] = stats["appended"]
+    chdir(cwd)
+    rmtree(directory)
+    return results
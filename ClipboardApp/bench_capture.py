@@ -0,0 +1,224 @@
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from time import perf_counter, sleep
+from types import SimpleNamespace
+from clipboard import check_clipboard
+from engine import Engine, Scheduler
+from filters import IdFilter
+from readers import PyperclipReader, TkReader, X11Reader
+from watcher import AdaptivePollScheduler, FakeWatcher, fingerprint
+
+
+# Minimal stand-in for 'App' with just the attributes the capture loop touches, on a headless 'Engine'
+def headless_app(watcher, app_data_dir: str) -> SimpleNamespace:
+    engine = Engine(Scheduler(), app_data_dir)
+    engine.master_id = "MASTER"
+    app = SimpleNamespace(
+        running=True,
+        watcher=watcher,
+        engine=engine,
+        previous_clipboard="",
+        clipboard_fingerprint=None,
+        max_payload_size=64 * 1024,
+        id_filter=IdFilter(),
+        current_clipboard="",
+        captured=[],
+    )
+    app.queue_master_id = lambda unique_id: app.captured.append(unique_id)
+    app.queue_status = lambda message: None
+    return app
+
+
+# Fire synthetic copies through 'FakeWatcher' & report throughput & capture loss; raises when a copy the loop
+# saw wasn't captured ('lost' are back-to-back copies overwritten before a read, as on a real clipboard)
+def bench_watcher(events: int, gap: float) -> dict:
+    watcher = FakeWatcher()
+    directory = mkdtemp()
+    app = headless_app(watcher, directory)
+
+    # Run capture loop on its own thread, like 'start_listening'
+    thread = Thread(target=check_clipboard, args=(app,), daemon=True)
+    thread.start()
+
+    start = perf_counter()
+    for i in range(events):
+        watcher.fire(f"ID{i:08d}")
+        if gap:
+            sleep(gap)
+
+    # Give the loop a moment to read the last event, then stop it
+    sleep(0.05)
+    elapsed = perf_counter() - start
+    app.running = False
+    watcher.stop()
+    thread.join()
+
+    app.engine.lock.release()
+    rmtree(directory)
+
+    metrics = watcher.metrics.snapshot()
+    results = {
+        "events": events,
+        "captured": len(app.captured),
+        "lost": metrics.get("lost", 0),
+        "events_per_sec": round(events / elapsed),
+        "wakeups": metrics.get("wakeups", 0),
+    }
+    if results["captured"] + results["lost"] < events:
+        raise AssertionError(f"Capture loop lost copies: {results}")
+    return results
+
+
+# Synthetic shift: a burst of 'burst' copies 'spacing' seconds apart every 'every' seconds
+def shift_timeline(hours: float, every: float = 300.0, burst: int = 10, spacing: float = 0.3) -> list:
+    copies = []
+    start = 0.0
+    while start < hours * 3600:
+        copies.extend(start + i * spacing for i in range(burst))
+        start += every
+    return copies
+
+
+# Replay a shift in virtual time against a poll schedule, counting wakeups, misses & detection latency
+def simulate_polling(copies: list, scheduler: AdaptivePollScheduler, fixed: float = 0.0) -> dict:
+    now, index, missed, latency = 0.0, 0, 0, 0.0
+    end = copies[-1] + 1.0
+    wakeups = 0
+    while now < end:
+        now += fixed or scheduler.interval
+        wakeups += 1
+
+        # Copies since the previous poll, only the last one is still on the clipboard
+        seen = index
+        while index < len(copies) and copies[index] <= now:
+            index += 1
+        if index > seen:
+            missed += index - seen - 1
+            latency += now - copies[index - 1]
+            scheduler.on_change()
+        else:
+            scheduler.on_idle()
+
+    detected = len(copies) - missed
+    return {
+        "wakeups": wakeups,
+        "missed": missed,
+        "avg_latency_ms": round(latency / detected * 1000, 1) if detected else 0.0,
+    }
+
+
+# Compare the old fixed 100 ms poll with the adaptive scheduler over a full shift
+def bench_scheduler(hours: float) -> dict:
+    copies = shift_timeline(hours)
+    fixed = simulate_polling(copies, AdaptivePollScheduler(), fixed=0.1)
+    adaptive = simulate_polling(copies, AdaptivePollScheduler())
+    results = {"copies": len(copies)}
+    results.update({f"fixed_{key}": value for key, value in fixed.items()})
+    results.update({f"adaptive_{key}": value for key, value in adaptive.items()})
+    return results
+
+
+# Time 'reads' clipboard reads through 'reader', return reads/sec & per-read latency
+def time_reader(reader, reads: int) -> dict:
+    latencies = []
+    start = perf_counter()
+    for _ in range(reads):
+        began = perf_counter()
+        reader.read()
+        latencies.append(perf_counter() - began)
+    elapsed = perf_counter() - start
+    latencies.sort()
+    return {
+        "reads_per_sec": round(reads / elapsed),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+    }
+
+
+# Compare in-process readers against the 'pyperclip' path, skipping readers this machine can't run
+def bench_readers(reads: int) -> dict:
+    results = {}
+    root = None
+    try:
+        from tkinter import Tk
+        root = Tk()
+        root.withdraw()
+        root.clipboard_clear()
+        root.clipboard_append("ID00000001")
+        root.update()
+    except Exception as e:
+        results["tk"] = f"unavailable ({e})"
+
+    candidates = [("pyperclip", PyperclipReader.available, lambda: PyperclipReader())]
+    if root is not None:
+        candidates.append(("tk", lambda: True, lambda: TkReader(root)))
+    candidates.append(("x11", X11Reader.available, lambda: X11Reader(root)))
+
+    for name, available, build in candidates:
+        if not available():
+            results[name] = "unavailable"
+            continue
+        reader = build()
+        try:
+            for key, value in time_reader(reader, reads).items():
+                results[f"{name}_{key}"] = value
+        finally:
+            reader.close()
+
+    if root is not None:
+        root.destroy()
+    return results
+
+
+# Per-poll cost of an unchanged clipboard payload: old strip & compare & format vs fingerprint & size cap
+def bench_payload(polls: int, limit: int = 64 * 1024) -> dict:
+    results = {}
+    for size in (100, 10_000, 1_000_000, 5_000_000):
+        # Distinct string objects per poll (hashes aren't cached), like every 'paste()' returns
+        count = polls if size < 1_000_000 else min(polls, 20)
+        base = "x" * size
+        payloads = [(base + ".")[:-1] for _ in range(count)]
+        previous = base.strip()
+
+        start = perf_counter()
+        for content in payloads:
+            current = content.strip()
+            _ = f"Current clipboard content: {current}"
+            _ = current != "MASTER" and current != previous
+        old = (perf_counter() - start) / count
+
+        payloads = [(base + ".")[:-1] for _ in range(count)]
+        last = fingerprint(base) if size <= limit else (size, None)
+        start = perf_counter()
+        for content in payloads:
+            if len(content) > limit:
+                _ = (len(content), None) != last
+                continue
+            _ = fingerprint(content) != last
+        new = (perf_counter() - start) / count
+
+        results[f"{size}_old_us"] = round(old * 1e6, 2)
+        results[f"{size}_new_us"] = round(new * 1e6, 2)
+    return results
+
+
+# Cost of the ID filter per capture event at realistic payload sizes
+def bench_filter(events: int) -> dict:
+    id_filter = IdFilter()
+    samples = {
+        "id": "A1B2C3D4E5",
+        "email": "jane.doe@example.com",
+        "url": "https://example.com/records/123456?tab=history",
+        "paragraph": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40,
+        "spreadsheet": "A1B2C3D4E5\tF6G7H8I9J0\n" * 2500,
+    }
+    results = {}
+    for name, text in samples.items():
+        start = perf_counter()
+        for _ in range(events):
+            accepted = id_filter.accept(text)
+        elapsed = perf_counter() - start
+        results[f"{name}_{len(text)}B_ns"] = round(elapsed / events * 1e9)
+        results[f"{name}_accepted"] = accepted
+    return results
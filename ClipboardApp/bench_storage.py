@@ -0,0 +1,395 @@
+from json import dump, dumps, load
+from os import listdir, path
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from tracemalloc import get_traced_memory, start as trace_start, stop as trace_stop
+from types import SimpleNamespace
+from document import ApprovalsDocument, SECTIONS
+from duplicates import DuplicateIndex, read_approvals
+from history import HistoryLog, HistoryStack, complete_action, new_action
+from journal import Journal
+from masters import MasterIndex
+from persist import WriteTracker, atomic_write
+from store import StateStore
+
+
+# Previous 'append_to_file' algorithm: read whole file, scan for the header, insert into a list & rewrite
+def legacy_append(filepath: str, text: str, section: str) -> None:
+    following = dict(zip(SECTIONS, SECTIONS[1:]))
+    with open(filepath, "r+") as file:
+        lines = file.readlines()
+        if section in following:
+            section_index = lines.index(f"{section}\n") + 2
+            while not lines[section_index].startswith(following[section]):
+                section_index += 1
+            section_index -= 1
+        else:
+            section_index = lines.index("NOTES\n") + 2
+        lines.insert(section_index, text + "\n")
+        file.seek(0)
+        file.writelines(lines)
+
+
+# Approvals file with 'entries' APPROVALS lines & a few entries in every other section
+def build_document(entries: int) -> ApprovalsDocument:
+    document = ApprovalsDocument()
+    for i in range(entries):
+        document.insert("APPROVALS", f"MASTER{i // 10:06d} (ID{i:08d})")
+    for section in SECTIONS[1:]:
+        document.insert(section, f"{section.lower()} entry")
+    return document
+
+
+# Per-append cost of the section-indexed document vs the legacy scan at growing file sizes
+def bench_document(appends: int) -> dict:
+    results = {}
+    directory = mkdtemp()
+    filepath = path.join(directory, "bench.approvals.txt")
+    for entries in (1_000, 10_000, 100_000):
+        document = build_document(entries)
+        with open(filepath, "w") as file:
+            file.write(document.serialize())
+
+        start = perf_counter()
+        for i in range(appends):
+            legacy_append(filepath, f"NEW (ID{i:08d})", "NEW_MASTERS")
+        results[f"{entries}_legacy_ms"] = round((perf_counter() - start) / appends * 1000, 3)
+
+        start = perf_counter()
+        for i in range(appends):
+            document.insert("NEW_MASTERS", f"NEW (ID{i:08d})")
+        results[f"{entries}_insert_us"] = round((perf_counter() - start) / appends * 1e6, 3)
+
+        start = perf_counter()
+        for i in range(appends):
+            document.insert("NEW_MASTERS", f"NEW (ID{i:08d})")
+            with open(filepath, "w") as file:
+                file.write(document.serialize())
+        results[f"{entries}_insert_and_write_ms"] = round((perf_counter() - start) / appends * 1000, 3)
+    rmtree(directory)
+    return results
+
+
+# Journal append cost & startup replay time at growing entry counts, with a torn last record
+def bench_journal(appends: int) -> dict:
+    results = {}
+    directory = mkdtemp()
+    for entries in (1_000, 10_000, 100_000):
+        filepath = path.join(directory, f"{entries}.journal")
+        journal = Journal(filepath)
+        journal.snapshot(ApprovalsDocument().lines())
+        for i in range(entries):
+            journal.add("APPROVALS", f"MASTER{i // 10:06d} (ID{i:08d})")
+
+        start = perf_counter()
+        for i in range(appends):
+            journal.add("NEW_MASTERS", f"NEW (ID{i:08d})")
+        results[f"{entries}_append_us"] = round((perf_counter() - start) / appends * 1e6, 1)
+        journal.close()
+
+        # Simulate a crash mid-write
+        with open(filepath, "ab") as file:
+            file.write(b"0000dead {\"op\":\"add\",\"sec")
+
+        start = perf_counter()
+        document, _ = Journal(filepath).replay()
+        results[f"{entries}_replay_ms"] = round((perf_counter() - start) * 1000, 1)
+        results[f"{entries}_replayed_entries"] = sum(document.counts().values())
+    rmtree(directory)
+    return results
+
+
+# Undo history memory for a session of 'actions' appends: old full snapshots vs delta records
+def bench_undo_memory(actions: int) -> dict:
+    # Old scheme: every action re-read the whole file & display into a new snapshot tuple
+    document = ApprovalsDocument()
+    display = []
+    trace_start()
+    undo_stack = []
+    for i in range(actions):
+        text = f"MASTER{i // 10:06d} (ID{i:08d})"
+        file_state = "".join(document.lines()).splitlines(keepends=True)
+        display_state = "".join(display).splitlines(keepends=True)
+        undo_stack.append((file_state, display_state, i // 10, text, "C:/approvals", "2024.01.01"))
+        document.insert("APPROVALS", text)
+        display.append(text + "\n")
+    snapshot_bytes = get_traced_memory()[0]
+    trace_stop()
+    del undo_stack
+
+    # New scheme: one small delta record per action
+    app = SimpleNamespace(master_id_counter=0, last_processed_entry=None)
+    trace_start()
+    undo_stack = []
+    for i in range(actions):
+        text = f"MASTER{i // 10:06d} (ID{i:08d})"
+        action = new_action(app, "APPROVALS", i, text)
+        app.last_processed_entry = text
+        app.master_id_counter = i // 10
+        complete_action(app, action, f"MASTER{i // 10:06d}" if i % 10 == 0 else None)
+        undo_stack.append(action)
+    delta_bytes = get_traced_memory()[0]
+    trace_stop()
+
+    return {
+        "actions": actions,
+        "snapshot_total_mb": round(snapshot_bytes / 2 ** 20, 1),
+        "snapshot_bytes_per_action": snapshot_bytes // actions,
+        "delta_total_mb": round(delta_bytes / 2 ** 20, 2),
+        "delta_bytes_per_action": delta_bytes // actions,
+    }
+
+
+# Bounded history: push a long session through a budgeted stack, then undo all of it
+def bench_history(actions: int, policy: str = "spill") -> dict:
+    directory = mkdtemp()
+    stack = HistoryStack("undo", max_actions=500, max_bytes=512 * 1024, policy=policy, spill_dir=directory)
+    app = SimpleNamespace(master_id_counter=0, last_processed_entry=None)
+
+    start = perf_counter()
+    for i in range(actions):
+        stack.append(new_action(app, "APPROVALS", i, f"MASTER{i // 10:06d} (ID{i:08d})"))
+    push = perf_counter() - start
+    results = {f"pushed_{key}": value for key, value in stack.stats().items()}
+
+    start = perf_counter()
+    undone = 0
+    while stack:
+        stack.pop()
+        undone += 1
+    results["undone"] = undone
+    results["push_us"] = round(push / actions * 1e6, 2)
+    results["pop_us"] = round((perf_counter() - start) / max(undone, 1) * 1e6, 2)
+    results["page_ins"] = stack.stats().get("page_ins", 0)
+    rmtree(directory)
+    return results
+
+
+# Close & load time of undo/redo persistence: full JSON dump vs incremental history log
+def bench_stack_persistence() -> dict:
+    results = {}
+    directory = mkdtemp()
+    app = SimpleNamespace(master_id_counter=0, last_processed_entry=None)
+    for actions in (1_000, 10_000):
+        history = [new_action(app, "APPROVALS", i, f"MASTER{i // 10:06d} (ID{i:08d})") for i in range(actions)]
+
+        # Old: dump both stacks at close, load them whole at startup
+        filepath = path.join(directory, f"{actions}.json")
+        start = perf_counter()
+        with open(filepath, "w") as file:
+            dump({"undo_stack": history, "redo_stack": []}, file)
+        results[f"{actions}_json_close_ms"] = round((perf_counter() - start) * 1000, 2)
+        start = perf_counter()
+        with open(filepath, "r") as file:
+            load(file)
+        results[f"{actions}_json_load_ms"] = round((perf_counter() - start) * 1000, 2)
+
+        # New: pushes were logged as they happened, close only fsyncs
+        filepath = path.join(directory, f"{actions}.log")
+        log = HistoryLog(filepath, "2024.01.01")
+        undo = HistoryStack("undo", actions, 2 ** 30)
+        redo = HistoryStack("redo", actions, 2 ** 30)
+        log.attach(undo, redo)
+        for action in history:
+            undo.append(action)
+        start = perf_counter()
+        log.close()
+        results[f"{actions}_log_close_ms"] = round((perf_counter() - start) * 1000, 2)
+
+        start = perf_counter()
+        undo = HistoryStack("undo", 500, 512 * 1024, "spill", directory)
+        undo.extend(HistoryLog(filepath, "2024.01.01").replay()["undo"])
+        results[f"{actions}_log_load_ms"] = round((perf_counter() - start) * 1000, 2)
+    rmtree(directory)
+    return results
+
+
+# Startup cost of restoring saved state & history: old double read + eager replay vs. the single-pass store
+def bench_cold_start(actions: int) -> dict:
+    results = {}
+    directory = mkdtemp()
+    date = "2024.01.01"
+    app = SimpleNamespace(master_id_counter=0, last_processed_entry=None)
+    lines = [f"MASTER{i // 10:06d} (ID{i:08d})\n" for i in range(5000)]
+    with open(path.join(directory, "application_state_data.json"), "w") as file:
+        dump({"file_state": lines, "text_display_state": lines, "current_date": date}, file)
+
+    # Saved history: 'actions' pushes logged today
+    log = HistoryLog(path.join(directory, "stacks_state.log"), date)
+    undo = HistoryStack("undo", actions, 2 ** 30)
+    redo = HistoryStack("redo", actions, 2 ** 30)
+    log.attach(undo, redo)
+    for i in range(actions):
+        undo.append(new_action(app, "APPROVALS", i, f"MASTER{i // 10:06d} (ID{i:08d})"))
+    log.close()
+    spill_dir = path.join(directory, "history")
+
+    # Old: state file read by both loaders, history replayed before the window shows
+    start = perf_counter()
+    for _ in range(2):
+        with open(path.join(directory, "application_state_data.json"), "r") as file:
+            load(file)
+    undo = HistoryStack("undo", 500, 512 * 1024, "spill", spill_dir)
+    undo.extend(HistoryLog(log.filepath, date).replay()["undo"])
+    results["eager_start_ms"] = round((perf_counter() - start) * 1000, 2)
+
+    # New: state file read once, history only checked for today's date
+    start = perf_counter()
+    store = StateStore(directory, date)
+    store.load()
+    store.history_pending(HistoryLog(log.filepath, date))
+    results["lazy_start_ms"] = round((perf_counter() - start) * 1000, 2)
+    results.update(store.metrics.snapshot())
+
+    # Deferred cost, paid on the first undo/redo
+    start = perf_counter()
+    undo = HistoryStack("undo", 500, 512 * 1024, "spill", spill_dir)
+    undo.extend(HistoryLog(log.filepath, date).replay()["undo"])
+    results["first_undo_ms"] = round((perf_counter() - start) * 1000, 2)
+    rmtree(directory)
+    return results
+
+
+# Repeated saves of mostly unchanged state: unconditional rewrites vs. content-hash dirty tracking
+def bench_dirty_writes(events: int, change_every: int = 10) -> dict:
+    directory = mkdtemp()
+    filepath = path.join(directory, "application_state_data.json")
+    lines = [f"MASTER{i // 10:06d} (ID{i:08d})\n" for i in range(2000)]
+    tracker = WriteTracker()
+    results = {}
+    for name, save in (("always", atomic_write), ("tracked", tracker.write)):
+        start = perf_counter()
+        for event in range(events):
+            save(filepath, str({"file_state": lines, "master_id_counter_state": event // change_every}))
+        results[f"{name}_ms"] = round((perf_counter() - start) * 1000, 2)
+    results.update(tracker.metrics.snapshot())
+    rmtree(directory)
+    return results
+
+
+# Saved state size for a full day: state carrying the display copy vs. the document only
+def bench_state_size(entries: int = 5000) -> dict:
+    document = build_document(entries)
+    results = {}
+    for mode in ("with_display", "document_only"):
+        trace_start()
+        file_state = document.lines()
+        state = {"file_state": file_state, "master_id_counter_state": 1, "current_date": "2024.01.01"}
+        if mode == "with_display":
+            # Old: display text re-extracted from the widget with its own line strings
+            state["text_display_state"] = [line + "\n" for line in document.display_lines()]
+        _, peak = get_traced_memory()
+        trace_stop()
+        results[f"{mode}_memory_kb"] = round(peak / 1024, 1)
+        results[f"{mode}_json_kb"] = round(len(dumps(state)) / 1024, 1)
+    return results
+
+
+# Unique master counting across a restart & the cost of the persistent index over a year of days
+def bench_master_index(days: int = 250, masters_per_day: int = 200, lookups: int = 100000) -> dict:
+    directory = mkdtemp()
+    filepath = path.join(directory, "master_ids.log")
+    results = {"days": days, "masters_per_day": masters_per_day}
+
+    # A year of history, one master ID reappearing on a later day every fifth entry
+    index = MasterIndex(filepath, "day-0000")
+    for day in range(days):
+        index.date = f"day-{day:04d}"
+        index.update(f"M{day * masters_per_day + i:07d}" if i % 5 else f"M{i:07d}" for i in range(masters_per_day))
+    index.close()
+    results["log_kb"] = round(path.getsize(filepath) / 1024, 1)
+
+    # Old: an in-memory set, emptied by a mid-day restart so the day's masters are counted again
+    today = [f"T{i:05d}" for i in range(masters_per_day)]
+    counted = set()
+    counter = 0
+    for half in (today[:masters_per_day // 2], today):
+        counted = set()
+        for master_id in half:
+            if master_id not in counted:
+                counted.add(master_id)
+                counter += 1
+    results["set_counter_after_restart"] = counter
+
+    # New: the index keeps the morning's masters across the restart
+    today_date = f"day-{days:04d}"
+    counter = 0
+    for half in (today[:masters_per_day // 2], today):
+        index = MasterIndex(filepath, today_date)
+        for master_id in half:
+            if master_id not in index:
+                index.add(master_id)
+                counter += 1
+        index.close()
+    results["index_counter_after_restart"] = counter
+    results["expected_counter"] = masters_per_day
+
+    # Cold load of the whole log, then lookups of today & earlier days
+    index = MasterIndex(filepath, today_date)
+    start = perf_counter()
+    len(index)
+    results["cold_load_ms"] = round((perf_counter() - start) * 1000, 1)
+    start = perf_counter()
+    for i in range(lookups):
+        f"M{i % (days * masters_per_day):07d}" in index
+    results["lookup_us"] = round((perf_counter() - start) / lookups * 1e6, 2)
+    start = perf_counter()
+    for i in range(lookups):
+        index.seen_before(f"M{i % (days * masters_per_day):07d}")
+    results["seen_before_us"] = round((perf_counter() - start) / lookups * 1e6, 2)
+
+    # Cost of counting a new master: one flushed record
+    start = perf_counter()
+    for i in range(1000):
+        index.add(f"N{i:05d}")
+    results["add_us"] = round((perf_counter() - start) / 1000 * 1e6, 1)
+    index.close()
+    results["metrics"] = index.metrics.snapshot()
+    rmtree(directory)
+    return results
+
+
+# Repeat lookups at capture time against a year of daily approvals files, from a cold build, the cache
+# & after one file changed; the old way to find a repeat was reading every file
+def bench_duplicates(days: int = 365, approvals_per_day: int = 400, lookups: int = 100000) -> dict:
+    directory = mkdtemp()
+    cache_dir = path.join(directory, "cache")
+    results = {"days": days, "approvals_per_day": approvals_per_day}
+    for day in range(days):
+        document = ApprovalsDocument()
+        for i in range(approvals_per_day):
+            document.insert("APPROVALS", f"M{day % 50:04d} (U{day * approvals_per_day + i:08d})")
+        with open(path.join(directory, f"2025.{day:04d}.approvals.txt"), "w") as file:
+            file.write(document.serialize())
+    today_file = "2026.01.01.approvals.txt"
+
+    # Old: scan every file for one new ID
+    start = perf_counter()
+    any("M0000 (NEW)" in read_approvals(path.join(directory, name))
+        for name in sorted(listdir(directory)) if name.endswith(".approvals.txt"))
+    results["scan_all_files_ms"] = round((perf_counter() - start) * 1000, 1)
+
+    for stage in ("cold_build", "cached_load", "one_file_changed"):
+        if stage == "one_file_changed":
+            with open(path.join(directory, "2025.0100.approvals.txt"), "a") as file:
+                file.write("M0000 (CHANGED)\n")
+        index = DuplicateIndex(directory, today_file, cache_dir)
+        start = perf_counter()
+        index.load()
+        results[f"{stage}_ms"] = round((perf_counter() - start) * 1000, 1)
+    results["cache_kb"] = round(path.getsize(index.cache_path) / 1024, 1)
+    results["parsed_files_after_change"] = index.metrics.count("parsed_files")
+
+    # Lookups at capture time, half repeats of earlier days & half new IDs
+    index.watch(ApprovalsDocument())
+    texts = [f"M{(i % days) % 50:04d} (U{i % days * approvals_per_day + i % approvals_per_day:08d})" if i % 2
+             else f"M0001 (NEW{i:08d})" for i in range(lookups)]
+    start = perf_counter()
+    found = sum(index.lookup(text) is not None for text in texts)
+    results["lookup_us"] = round((perf_counter() - start) / lookups * 1e6, 2)
+    results["repeats_found"] = found
+    results["expected_repeats"] = lookups // 2
+    results["history_approvals"] = index.stats()["history"]
+    rmtree(directory)
+    return results
@@ -0,0 +1,400 @@
+from heapq import heappop, heappush
+from json import dump, load
+from os import chdir, getcwd, path
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from time import perf_counter, sleep
+from types import SimpleNamespace
+from autosave import AutosaveService
+from display import IdDisplay
+from document import ApprovalsDocument
+from engine import Engine
+from journal import materialize, record_insert
+from metrics import Metrics
+from monitors import MonitorCache, TopmostController
+from persist import WriteTracker
+from uiqueue import StallMonitor, UiQueue
+from writer import FileWriter, io_barrier
+
+
+# Stand-in for the Tk root that runs 'after' callbacks when told to
+class ManualRoot:
+    def __init__(self) -> None:
+        self.jobs = {}
+        self.next_job = 0
+
+    def after(self, delay: int, callback, *args) -> int:
+        self.next_job += 1
+        self.jobs[self.next_job] = (callback, args)
+        return self.next_job
+
+    def after_cancel(self, job: int) -> None:
+        self.jobs.pop(job, None)
+
+    # Fire every pending callback, as if the debounce elapsed
+    def run(self) -> None:
+        jobs, self.jobs = self.jobs, {}
+        for callback, args in jobs.values():
+            callback(*args)
+
+
+# Time spent on the Tk thread saving state after every change vs. debounced background autosave
+def bench_autosave(events: int, burst: int = 20) -> dict:
+    directory = mkdtemp()
+    filepath = path.join(directory, "application_state_data.json")
+    state = {"file_state": [f"MASTER{i // 10:06d} (ID{i:08d})\n" for i in range(2000)], "master_id_counter_state": 0}
+
+    # Old: dump in place on the Tk thread for every change
+    start = perf_counter()
+    for event in range(events):
+        state["master_id_counter_state"] = event
+        with open(filepath, "w") as file:
+            dump(state, file)
+    in_place = perf_counter() - start
+
+    # New: mark dirty on the Tk thread, one atomic write per settled burst on the worker
+    root = ManualRoot()
+    autosave = AutosaveService(root, filepath, lambda: dict(state), 2000)
+    blocked = 0.0
+    for event in range(events):
+        state["master_id_counter_state"] = event
+        start = perf_counter()
+        autosave.mark_dirty()
+        if (event + 1) % burst == 0:
+            root.run()
+        blocked += perf_counter() - start
+    root.run()
+    autosave.flush()
+    autosave.stop()
+    with open(filepath, "r") as file:
+        saved = load(file)["master_id_counter_state"]
+    rmtree(directory)
+
+    results = {
+        "in_place_writes": events,
+        "in_place_tk_ms": round(in_place * 1000, 2),
+        "autosave_tk_ms": round(blocked * 1000, 2),
+        "last_change_saved": saved == events - 1,
+    }
+    results.update(autosave.metrics.snapshot())
+    return results
+
+
+# Stand-in for the Tk root that runs 'after' callbacks at their due time on the calling thread
+class TimedRoot(ManualRoot):
+    def __init__(self) -> None:
+        super().__init__()
+        self.due = []
+
+    def after(self, delay: int, callback, *args) -> int:
+        job = super().after(delay, callback, *args)
+        heappush(self.due, (perf_counter() + delay / 1000, job))
+        return job
+
+    # Run the event loop until 'done' returns True
+    def mainloop(self, done) -> None:
+        while not done():
+            if not self.due:
+                sleep(0.001)
+                continue
+            when, job = heappop(self.due)
+            sleep(max(0.0, when - perf_counter()))
+            if job in self.jobs:
+                callback, args = self.jobs.pop(job)
+                callback(*args)
+
+
+# Captures handed from a worker thread to a simulated Tk loop: queue depth & capture-to-display latency
+def bench_ui_queue(events: int, gap: float) -> dict:
+    root = TimedRoot()
+    document = ApprovalsDocument()
+    queue = UiQueue(root, lambda unique_id: document.insert("APPROVALS", f"MASTER ({unique_id})"))
+    queue.start()
+
+    def produce() -> None:
+        for i in range(events):
+            queue.put(f"ID{i:08d}")
+            if gap:
+                sleep(gap)
+
+    producer = Thread(target=produce, daemon=True)
+    start = perf_counter()
+    producer.start()
+    root.mainloop(lambda: not producer.is_alive() and queue.metrics.count("queued") == len(document.entries("APPROVALS")))
+    elapsed = perf_counter() - start
+    queue.stop()
+
+    results = {"events": events, "handled": len(document.entries("APPROVALS")), "events_per_sec": round(events / elapsed)}
+    results.update({key: round(value, 3) for key, value in queue.metrics.snapshot().items()})
+    return results
+
+
+# Tk wakeups of the app's two drains (captures & writer completions) while not listening: both fixed-rate vs.
+# captures drained only while listening & completions backing off; & the latency of the first capture once listening
+def bench_idle_wakeups(seconds: float = 3.0) -> dict:
+    results = {}
+    for mode, idle_interval in (("fixed", 0), ("backoff", 250)):
+        root = TimedRoot()
+        handled = []
+        captures = UiQueue(root, handled.extend, 50, batched=True)
+        completions = UiQueue(root, lambda callback: callback(), 20, idle_interval=idle_interval)
+        # Old scheme drained captures even while not listening
+        if not idle_interval:
+            captures.start()
+        completions.start()
+        end = perf_counter() + seconds
+        root.mainloop(lambda: perf_counter() >= end)
+        drains = captures.metrics.count("drains") + completions.metrics.count("drains")
+        results[f"{mode}_wakeups_per_sec"] = round(drains / seconds, 1)
+
+        # Listening starts, captures are drained every window from here on
+        captures.start()
+        captures.put("ID00000001")
+        root.mainloop(lambda: bool(handled))
+        results[f"{mode}_first_capture_ms"] = round(captures.metrics.snapshot()["latency_ms.max"], 1)
+        captures.stop()
+        completions.stop()
+    return results
+
+
+# Tk loop stalls while appending on a slow disk: journal & file I/O inline vs. on the writer thread
+def bench_writer(appends: int, latency: float = 0.02) -> dict:
+    results = {}
+    for mode in ("inline", "writer"):
+        directory = mkdtemp()
+        root = TimedRoot()
+        app = SimpleNamespace(
+            root=root, filepath=path.join(directory, "2024.01.01.approvals.txt"), document=None, document_path=None,
+            document_signature=None, journal=None, journal_batch_size=32, journal_fsync_interval=1.0,
+            materialize_delay=100, materialize_job=None, write_tracker=WriteTracker(),
+            writer=FileWriter() if mode == "writer" else None,
+        )
+        monitor = StallMonitor(root, interval=10, threshold=16)
+        monitor.start()
+
+        # Slow working directory: every journal record costs 'latency' seconds
+        record_insert(app, "APPROVALS", "MASTER (ID00000000)")
+        io_barrier(app)
+        append = app.journal.append
+        app.journal.append = lambda record: (sleep(latency), append(record))
+
+        added = []
+
+        def tick() -> None:
+            record_insert(app, "APPROVALS", f"MASTER (ID{len(added) + 1:08d})")
+            added.append(perf_counter())
+            if len(added) < appends:
+                root.after(20, tick)
+
+        root.after(20, tick)
+        root.mainloop(lambda: len(added) >= appends)
+        materialize(app)
+        io_barrier(app)
+        monitor.stop()
+        if app.writer is not None:
+            app.writer.stop()
+        app.journal.close()
+
+        metrics = monitor.metrics.snapshot()
+        results[f"{mode}_late_ms_avg"] = round(metrics.get("late_ms.avg", 0), 2)
+        results[f"{mode}_late_ms_max"] = round(metrics.get("late_ms.max", 0), 2)
+        results[f"{mode}_stalls"] = metrics.get("stalls", 0)
+        rmtree(directory)
+    return results
+
+
+# Widget stand-in that ignores every call
+class NullWidget:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+# Sustained capture throughput through the Tk-side pipeline (queue, append, journal) with & without coalescing
+def bench_coalesce(events: int, gap: float, window: int = 50) -> dict:
+    results = {}
+    cwd = getcwd()
+    for mode in ("single", "coalesced"):
+        directory = mkdtemp()
+        chdir(directory)
+        root = TimedRoot()
+        engine = Engine(root, path.join(directory, "data"), FileWriter())
+        engine.master_id = "MASTER"
+        queue = UiQueue(root, engine.process_master_ids, window, batched=True) if mode == "coalesced" \
+            else UiQueue(root, lambda unique_id: engine.process_master_ids([unique_id]))
+        queue.start()
+
+        def produce() -> None:
+            for i in range(events):
+                queue.put(f"ID{i:08d}")
+                if gap:
+                    sleep(gap)
+
+        producer = Thread(target=produce, daemon=True)
+        start = perf_counter()
+        producer.start()
+        root.mainloop(lambda: not producer.is_alive() and engine.document is not None and
+                      len(engine.document.sections["APPROVALS"].entries) == events)
+        io_barrier(engine)
+        elapsed = perf_counter() - start
+        queue.stop()
+        engine.writer.stop()
+        engine.journal.close()
+        chdir(cwd)
+        rmtree(directory)
+
+        results[f"{mode}_ids_per_sec"] = round(events / elapsed)
+        results[f"{mode}_journal_writes"] = engine.writer.metrics.count("commands")
+        results[f"{mode}_latency_ms_max"] = round(queue.metrics.snapshot().get("latency_ms.max", 0), 2)
+    return results
+
+
+# Line-based stand-in for a Tk Text widget, supporting the indexes the ID display uses
+class LineText(NullWidget):
+    def __init__(self) -> None:
+        self.content = []
+        self.calls = 0
+
+    # Line number (0-based) for '1.0'-style, 'end' & 'end-Nl' indexes
+    def _line(self, index: str) -> int:
+        if index == "end":
+            return len(self.content)
+        if index.startswith("end-"):
+            return len(self.content) + 1 - int(index[4:-1])
+        return int(index.split(".")[0]) - 1
+
+    def insert(self, index: str, text: str, *tags) -> None:
+        self.calls += 1
+        position = self._line(index)
+        self.content[position:position] = text.splitlines()
+
+    def delete(self, first: str, last: str = None) -> None:
+        self.calls += 1
+        del self.content[self._line(first):self._line(last)]
+
+    def get(self, first: str, last: str) -> str:
+        return "".join(line + "\n" for line in self.content) + "\n"
+
+
+# Startup restore & per-append display cost by day size: line-by-line widget vs. virtualized display
+def bench_display(appends: int) -> dict:
+    results = {}
+    for entries in (1_000, 10_000, 100_000):
+        lines = [f"MASTER{i // 10:06d} (ID{i:08d})" for i in range(entries)]
+
+        # Old: one insert per saved line, every line stays in the widget
+        widget = LineText()
+        start = perf_counter()
+        for line in lines:
+            widget.insert("end", line + "\n", "center")
+        results[f"{entries}_line_restore_ms"] = round((perf_counter() - start) * 1000, 2)
+        start = perf_counter()
+        for i in range(appends):
+            widget.insert("end", f"MASTER (NEW{i:08d})\n", "center")
+            widget.get("1.0", "end").splitlines(keepends=True)
+        results[f"{entries}_line_append_us"] = round((perf_counter() - start) * 1e6 / appends, 1)
+        results[f"{entries}_line_widget_lines"] = len(widget.content)
+
+        # New: one batched insert of the newest lines, older lines only in the model
+        widget = LineText()
+        display = IdDisplay(widget)
+        start = perf_counter()
+        display.reset(lines)
+        results[f"{entries}_virtual_restore_ms"] = round((perf_counter() - start) * 1000, 2)
+        start = perf_counter()
+        for i in range(appends):
+            display.append([f"MASTER (NEW{i:08d})"])
+        results[f"{entries}_virtual_append_us"] = round((perf_counter() - start) * 1e6 / appends, 1)
+        results[f"{entries}_virtual_widget_lines"] = len(widget.content)
+    return results
+
+
+# Stand-in for the Tk root during window drags: a simulated clock, window position & topmost flag
+class DragRoot(ManualRoot):
+    def __init__(self) -> None:
+        super().__init__()
+        self.clock = 0
+        self.due = {}
+        self.x = 0
+        self.topmost = False
+
+    def after(self, delay: int, callback, *args) -> int:
+        job = super().after(delay, callback, *args)
+        self.due[job] = self.clock + delay
+        return job
+
+    # Move the clock forward 'ms', running callbacks that fall due
+    def advance(self, ms: int) -> None:
+        self.clock += ms
+        for job, when in sorted(self.due.items(), key=lambda item: item[1]):
+            if when <= self.clock and job in self.jobs:
+                callback, args = self.jobs.pop(job)
+                callback(*args)
+        self.due = {job: when for job, when in self.due.items() if job in self.jobs}
+
+    def winfo_x(self) -> int:
+        return self.x
+
+    def winfo_screenwidth(self) -> int:
+        return 1920
+
+    def winfo_screenheight(self) -> int:
+        return 1080
+
+    def attributes(self, name: str, value: bool) -> None:
+        self.topmost = value
+
+
+# Monitor queries per window drag: topmost decided on every '<Configure>' vs. cached topology & debounced decisions
+def bench_topmost(moves: int, moves_per_drag: int = 50, child_events: int = 2) -> dict:
+    monitors = [SimpleNamespace(x=0, y=0, width=1920, height=1080), SimpleNamespace(x=1920, y=0, width=1920, height=1080)]
+    queries = Metrics()
+
+    def query() -> list:
+        queries.incr("queries")
+        return monitors
+
+    # Drag the window back & forth between monitors, each move also resizing 'child_events' widgets;
+    # a move every 8 ms & a 500 ms pause between drags
+    def drag(root, on_configure) -> int:
+        drags = 0
+        for move in range(moves):
+            if move % moves_per_drag == 0:
+                root.advance(500)
+                drags += 1
+            step = 3840 // moves_per_drag * (move % moves_per_drag)
+            root.x = step if drags % 2 else 3839 - step
+            for _ in range(child_events):
+                on_configure(SimpleNamespace(widget=None))
+            on_configure(SimpleNamespace(widget=root))
+            root.advance(8)
+        root.advance(500)
+        return drags
+
+    # Old: enumerate monitors & set the flag on every configure event
+    def adjust_every_event(event) -> None:
+        for index, monitor in enumerate(query()):
+            if monitor.x <= root.x <= monitor.x + monitor.width:
+                root.attributes("-topmost", index > 0)
+
+    root = DragRoot()
+    drags = drag(root, adjust_every_event)
+    old_queries, old_topmost = queries.count("queries"), root.topmost
+
+    # New: cached topology, one decision per settled move
+    queries.reset()
+    root = DragRoot()
+    topmost = TopmostController(root, MonitorCache(root, query))
+    drag(root, topmost.on_configure)
+
+    results = {
+        "drags": drags,
+        "configure_events": moves * (child_events + 1),
+        "every_event_queries": old_queries,
+        "every_event_queries_per_drag": round(old_queries / drags, 1),
+        "cached_queries": queries.count("queries"),
+        "cached_queries_per_drag": round(queries.count("queries") / drags, 2),
+        "same_topmost": root.topmost == old_topmost,
+    }
+    results.update(topmost.stats())
+    return results
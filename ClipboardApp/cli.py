@@ -0,0 +1,131 @@
+from argparse import ArgumentParser, FileType
+from logging import basicConfig, info, warning, INFO, WARNING
+from sys import stdin, stderr
+from time import perf_counter
+from typing import Iterable, List, Optional, Tuple
+from document import SECTIONS
+from engine import Engine, Scheduler
+from filters import IdFilter
+from store import get_app_data_dir, load_config, DataDirectoryLocked
+
+
+# Section & text of one input line: 'SECTION: text' when tagged with a section name, an approval otherwise
+def parse_line(line: str) -> Tuple[str, str]:
+    tag, separator, text = line.partition(":")
+    if separator and tag.strip().upper() in SECTIONS:
+        return tag.strip().upper(), text.strip()
+    return "APPROVALS", line.strip()
+
+
+# Bulk processing of ID lists through the engine in one streaming pass: consecutive lines of a section
+# are appended in batches (one journal write each) & the approvals file is written once at the end
+class BatchProcessor:
+    def __init__(self, engine: Engine, id_filter: Optional[IdFilter] = None, batch_size: int = 1000,
+                 undoable: bool = False) -> None:
+        self.engine = engine
+        # Keep one undo record per line, off by default: a bulk import isn't undone line by line
+        self.undoable = undoable
+        # Keeps header rows & stray cells out of the approvals, None appends every line
+        self.id_filter = id_filter
+        self.batch_size = batch_size
+        self._section = None
+        self._batch = []
+        # Lines read, appended & skipped
+        self.lines = 0
+        self.appended = 0
+        self.skipped = 0
+        # Approvals already in today's or an earlier approvals file, with that file
+        self.repeats = []
+        engine.on("duplicate", lambda text, filename: self.repeats.append((text, filename)))
+
+    def feed(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.lines += 1
+            if not line.strip():
+                continue
+            section, text = parse_line(line)
+            if section == "APPROVALS" and self.id_filter is not None and not self.id_filter.accept(text):
+                self.skipped += 1
+                continue
+            if section != self._section or len(self._batch) >= self.batch_size:
+                self.flush()
+                self._section = section
+            self._batch.append(text)
+
+    # Append the pending batch, approvals are combined with the master ID & counted like captured IDs
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        if self._section == "APPROVALS":
+            self.engine.process_master_ids(self._batch, self.undoable)
+        else:
+            self.engine.append(texts=self._batch, section=self._section, undoable=self.undoable)
+        self.appended += len(self._batch)
+        self._batch = []
+
+
+# Process 'lines' for 'master_id' into today's approvals file, return throughput stats
+def run(master_id: str, lines: Iterable[str], app_data_dir: str, directory: Optional[str] = None,
+        filter_ids: bool = True, batch_size: int = 1000, undoable: bool = False) -> dict:
+    # Headless engine writing inline, debounced writes are flushed by 'close'
+    engine = Engine(Scheduler(), app_data_dir)
+    engine.open()
+    if directory:
+        engine.set_working_directory(directory)
+    engine.master_id = master_id
+    counter = engine.master_id_counter
+
+    id_filter = IdFilter.from_config(load_config(app_data_dir)) if filter_ids else None
+    processor = BatchProcessor(engine, id_filter, batch_size, undoable)
+    start = perf_counter()
+    processor.feed(lines)
+    processor.flush()
+    engine.close()
+    elapsed = perf_counter() - start
+
+    return {
+        "file": engine.document_path,
+        "lines": processor.lines,
+        "appended": processor.appended,
+        "skipped": processor.skipped,
+        "new_masters": engine.master_id_counter - counter,
+        "repeats": len(processor.repeats),
+        "master_id_counter": engine.master_id_counter,
+        "seconds": round(elapsed, 3),
+        "lines_per_sec": round(processor.lines / elapsed) if elapsed else 0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description="Append a list of unique IDs for one master ID to today's approvals file")
+    parser.add_argument("master_id", help="Master ID the unique IDs are approved for")
+    parser.add_argument("input", nargs="?", type=FileType("r"), default=stdin,
+                        help="File of unique IDs, one per line, or 'SECTION: text' lines (default: stdin)")
+    parser.add_argument("--directory", help="Working directory of the approvals file (default: the app's)")
+    parser.add_argument("--no-filter", action="store_true", help="Append lines that don't look like IDs too")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Lines appended per journal write")
+    parser.add_argument("--undoable", action="store_true", help="Keep an undo record per line for the app")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    basicConfig(level=INFO if args.verbose else WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    master_id = args.master_id.strip()
+    if not master_id:
+        parser.error("Master ID is empty")
+
+    try:
+        stats = run(master_id, args.input, get_app_data_dir(), args.directory, not args.no_filter, args.batch_size,
+                    args.undoable)
+    except DataDirectoryLocked as e:
+        parser.exit(1, f"{e}, close the Clipboard Manager before a batch import\n")
+    if stats["skipped"]:
+        warning(f"Skipped {stats['skipped']} lines that don't look like IDs")
+    if stats["repeats"]:
+        warning(f"{stats['repeats']} IDs were already approved before, listed with --verbose")
+    info(f"Batch stats: {stats}")
+    for key, value in stats.items():
+        print(f"{key}: {value}", file=stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,59 @@
-from tkinter import NORMAL
 from logging import info, error, debug
-from time import sleep
-from pyperclip import paste
 
 
 def check_clipboard(app) -> None:
-    # Continuously check clipboard for changes
-    debug("Entered check_clipboard loop")
+    # Wait for clipboard changes reported by the selected watcher backend
+    debug(f"Entered check_clipboard loop with '{app.watcher.name}' watcher")
 
-    while app.running:
+    # Already imported by 'start_listening' on the Tk thread
+    from watcher import fingerprint
+
+    # Keep a local reference so a restarted listener never shares this watcher
+    watcher = app.watcher
+
+    while app.running and watcher.active:
         try:
+            # Block until the backend reports a possible change
+            if not watcher.wait(timeout=0.5):
+                continue
+
+            # Get raw clipboard content
+            content = watcher.read()
+
+            # Skip oversized payloads in O(1), without stripping or logging them
+            if len(content) > app.max_payload_size:
+                watcher.metrics.incr("oversize")
+                if app.clipboard_fingerprint != (len(content), None):
+                    app.clipboard_fingerprint = (len(content), None)
+                    info(f"Skipped clipboard payload of {len(content)} characters (limit {app.max_payload_size})")
+                continue
+
+            # Compare fingerprints so unchanged content is never stripped or logged again
+            current_fingerprint = fingerprint(content)
+            if current_fingerprint == app.clipboard_fingerprint:
+                watcher.metrics.incr("unchanged")
+                continue
+            app.clipboard_fingerprint = current_fingerprint
+
             # Get current clipboard content
-            app.current_clipboard = paste().strip()
-            debug(f"Current clipboard content: {app.current_clipboard}")
+            app.current_clipboard = content.strip()
+            debug(f"Current clipboard content: {app.current_clipboard[:80]}")
 
             # Check clipboard content is not previous 'master_id', not just whitespace, & is new
-            if app.current_clipboard != app.master_id and \
+            if app.current_clipboard != app.engine.master_id and \
                     app.current_clipboard != app.previous_clipboard:
-                info(f"New clipboard content detected: {app.current_clipboard}")
+                info(f"New clipboard content detected: {app.current_clipboard[:80]}")
 
                 if not app.current_clipboard == "":
-                    # Process 'master_id'
-                    app.process_master_id(unique_id=app.current_clipboard)
+                    # Skip content that doesn't look like an ID before any file I/O, & say so in the status bar
+                    if not app.id_filter.accept(app.current_clipboard):
+                        app.queue_status(
+                            f"Not captured ({app.id_filter.last_rejection}): {app.current_clipboard[:80]}"
+                        )
+                        continue
+
+                    # Hand 'master_id' to the Tk thread, which appends & displays it
+                    app.queue_master_id(unique_id=app.current_clipboard)
 
                     # Update 'previous_clipboard' content
                     app.previous_clipboard = app.current_clipboard
@@ -30,36 +62,13 @@ def check_clipboard(app) -> None:
         except Exception as e:
             error(f"Error checking clipboard: {e}")
 
-        # Sleep for 100 milliseconds before rechecking
-        sleep(0.1)
-
-
-# Functionality for processing & combining copied 'master_id's
-def process_master_id(app, unique_id: str) -> None:
-    debug(f"process_identifier called with unique_id: {unique_id}")
-    # Delay to ensure file accessibility
-    sleep(0.1)
-    try:
-        # Combine master ID with unique ID & append to file
-        combined_id = f"{app.master_id} ({unique_id})"
-        info(f"Processing identifier: {combined_id}")
-
-        # Store the last processed entry
-        app.last_processed_entry = combined_id
-
-        # Append combined ids
-        app.append_to_file(text=combined_id, section="APPROVALS")
-
-        # Enable Duplicate Entry button when a new ID was created
-        app.duplicate_entry_button.config(state=NORMAL)
-
-        # Check if master ID is unique & update unique id counter
-        if app.master_id not in app.unique_master_ids:
-            app.unique_master_ids.add(app.master_id)
-            app.master_id_counter += 1
-            app.update_counter_label()
-
-    except Exception as e:
-        error(f"Error processing identifier: {e}")
+    # Release backend resources from the thread that used them
+    watcher.close()
+    debug("Exited check_clipboard loop")
 
 
+# Queue copied ID for 'Engine.process_master_ids', runs on the clipboard thread & never touches widgets;
+# no delay, the writer thread retries while the approvals file is locked
+def queue_master_id(app, unique_id: str) -> None:
+    debug(f"queue_master_id called with unique_id: {unique_id}")
+    app.ui_queue.put(unique_id)
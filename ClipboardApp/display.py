@@ -0,0 +1,102 @@
+from tkinter import END
+from logging import debug
+from typing import Iterable, List
+from metrics import Metrics
+
+
+# Virtualized ID display: every display line is kept in a list, but only the newest 'capacity' lines
+# live in the Text widget; older lines are paged back in, 'page_size' at a time, when scrolled to the top
+class IdDisplay:
+    def __init__(self, widget, capacity: int = 500, page_size: int = 100) -> None:
+        self.widget = widget
+        self.capacity = capacity
+        self.page_size = page_size
+        # All display lines of the day, oldest first, without line endings
+        self.lines = []
+        # Index in 'lines' of the first line rendered in the widget
+        self.first = 0
+        self._page_job = None
+        # Widget calls & lines rendered, trimmed & paged in
+        self.metrics = Metrics()
+        self.widget.config(yscrollcommand=self._on_scroll)
+
+    # Lines currently rendered in the widget
+    def rendered(self) -> int:
+        return len(self.lines) - self.first
+
+    # Replace display with 'lines', rendering only the newest 'capacity' in one insert
+    def reset(self, lines: Iterable[str]) -> None:
+        self.lines = list(lines)
+        self.first = max(0, len(self.lines) - self.capacity)
+        self.widget.delete("1.0", END)
+        self._insert(END, self.lines[self.first:])
+        self.widget.see(END)
+
+    # Append entries (possibly multi-line) in one insert, trimming the oldest rendered lines a page at a time
+    def append(self, texts: Iterable[str]) -> None:
+        new_lines = [line for text in texts for line in text.split("\n")]
+        self.lines.extend(new_lines)
+        self._insert(END, new_lines)
+
+        # Trim once the widget holds a full page over capacity so trims don't run on every append
+        overflow = self.rendered() - self.capacity
+        if overflow >= self.page_size:
+            self.widget.delete("1.0", f"{overflow + 1}.0")
+            self.first += overflow
+            self.metrics.incr("trimmed_lines", overflow)
+        self.widget.see(END)
+
+    # Remove the newest occurrence of 'text' (possibly multi-line), e.g. when its entry is undone
+    def remove_entry(self, text: str) -> None:
+        entry = text.split("\n")
+        count = len(entry)
+        # Search from the end, undone entries are almost always the newest lines
+        for start in range(len(self.lines) - count, -1, -1):
+            if self.lines[start:start + count] == entry:
+                break
+        else:
+            return
+
+        del self.lines[start:start + count]
+        if start >= self.first:
+            line = start - self.first + 1
+            self.widget.delete(f"{line}.0", f"{line + count}.0")
+        else:
+            # Entry above the rendered window, only the model changes
+            self.first -= count
+        self.widget.see(END)
+
+    # Highlight the newest rendered line equal to 'text', e.g. a repeated approval
+    def flag(self, text: str, tag: str = "duplicate") -> None:
+        for index in range(len(self.lines) - 1, self.first - 1, -1):
+            if self.lines[index] == text:
+                line = index - self.first + 1
+                self.widget.tag_add(tag, f"{line}.0", f"{line}.end")
+                self.widget.see(f"{line}.0")
+                return
+
+    # Render the page of lines just above the widget's first line & keep the view where it was
+    def page_in(self) -> None:
+        self._page_job = None
+        if self.first == 0:
+            return
+        start = max(0, self.first - self.page_size)
+        page = self.lines[start:self.first]
+        self._insert("1.0", page)
+        self.first = start
+        self.widget.yview(f"{len(page) + 1}.0")
+        self.metrics.incr("paged_lines", len(page))
+        debug(f"Paged {len(page)} older lines into the ID display")
+
+    # Insert 'lines' with a single widget call
+    def _insert(self, index: str, lines: List[str]) -> None:
+        if not lines:
+            return
+        self.widget.insert(index, "".join(line + "\n" for line in lines), "center")
+        self.metrics.incr("inserts")
+        self.metrics.observe("insert_lines", len(lines))
+
+    # View scrolled to the top with older lines left, page them in once the scroll settles
+    def _on_scroll(self, first: str, last: str) -> None:
+        if float(first) <= 0.0 and self.first > 0 and self._page_job is None:
+            self._page_job = self.widget.after_idle(self.page_in)
@@ -0,0 +1,155 @@
+from collections import deque
+from logging import debug
+from os import stat
+from typing import Dict, List, Optional
+
+
+# Section headers in file order
+SECTIONS = ("APPROVALS", "NEW_MASTERS", "SPLIT", "MERGE", "NOTES")
+
+# Section whose newest entry goes first, right under its header
+PREPEND_SECTIONS = ("NOTES",)
+
+
+# One section of the approvals file: header, blank lead line, entries & the line before the next header
+class Section:
+    def __init__(self, name: str, lead: str = "\n", trail: Optional[str] = "\n", entries: List[str] = ()) -> None:
+        self.name = name
+        self.header = f"{name}\n"
+        self.lead = lead
+        # None for the last section, which runs to end of file
+        self.trail = trail
+        self.entries = deque(entries)
+        # Physical lines held by 'entries' (an entry may span several lines)
+        self.entry_lines = sum(entry.count("\n") for entry in self.entries)
+
+    # Number of physical lines this section occupies
+    def line_count(self) -> int:
+        return 2 + self.entry_lines + (self.trail is not None)
+
+    # File lines of this section
+    def lines(self) -> List[str]:
+        lines = [self.header, self.lead]
+        lines.extend(self.entries)
+        if self.trail is not None:
+            lines.append(self.trail)
+        return lines
+
+
+# Section-indexed, in-memory model of a daily '.approvals.txt' file
+class ApprovalsDocument:
+    def __init__(self, preamble: List[str] = ("\n",), sections: Optional[Dict[str, Section]] = None) -> None:
+        # Lines before the APPROVALS header
+        self.preamble = list(preamble)
+        self.sections = sections or {
+            name: Section(name, trail=None if name == SECTIONS[-1] else "\n") for name in SECTIONS
+        }
+
+    # Parse file lines (with line endings) once into sections
+    @classmethod
+    def parse(cls, lines: List[str]) -> "ApprovalsDocument":
+        # Locate headers the same way the original line scan did
+        headers = []
+        start = 0
+        for name in SECTIONS:
+            try:
+                index = lines.index(f"{name}\n", start)
+            except ValueError:
+                raise ValueError(f"Approvals file is missing the {name} header")
+            headers.append(index)
+            start = index + 1
+
+        sections = {}
+        for position, name in enumerate(SECTIONS):
+            index = headers[position]
+            lead = lines[index + 1] if index + 1 < len(lines) else "\n"
+            if position + 1 < len(SECTIONS):
+                # Entries run up to the line before the next header
+                end = headers[position + 1] - 1
+                if end < index + 1:
+                    raise ValueError(f"Approvals file section {name} is malformed")
+                sections[name] = Section(name, lead, lines[end], lines[index + 2:end])
+            else:
+                sections[name] = Section(name, lead, None, lines[index + 2:])
+
+        document = cls(lines[:headers[0]], sections)
+        debug(f"Parsed approvals document: {document.counts()}")
+        return document
+
+    # Insert 'text' under 'section' in O(1), return its index within the section
+    def insert(self, section: str, text: str) -> int:
+        target = self.sections[section if section in self.sections else SECTIONS[-1]]
+        entry = text + "\n"
+        target.entry_lines += entry.count("\n")
+        if target.name in PREPEND_SECTIONS:
+            target.entries.appendleft(entry)
+            return 0
+        target.entries.append(entry)
+        return len(target.entries) - 1
+
+    # Index of 'text' in 'section', trusting 'index' unless the file was edited outside the app since the insert
+    def locate(self, section: str, index: int, text: str) -> int:
+        entries = self.sections[section if section in self.sections else SECTIONS[-1]].entries
+        if 0 <= index < len(entries) and entries[index] == text + "\n":
+            return index
+        # Search by value, newest occurrence first
+        if section in PREPEND_SECTIONS or section not in self.sections:
+            return list(entries).index(text + "\n")
+        return len(entries) - 1 - list(reversed(entries)).index(text + "\n")
+
+    # Remove & return entry 'index' of 'section', O(1) at either end (undo always removes the newest entry)
+    def remove(self, section: str, index: int) -> str:
+        target = self.sections[section if section in self.sections else SECTIONS[-1]]
+        if index == 0:
+            entry = target.entries.popleft()
+        elif index == len(target.entries) - 1:
+            entry = target.entries.pop()
+        else:
+            entry = target.entries[index]
+            del target.entries[index]
+        target.entry_lines -= entry.count("\n")
+        return entry[:-1]
+
+    # Entries of 'section' without line endings
+    def entries(self, section: str) -> List[str]:
+        return [entry[:-1] for entry in self.sections[section].entries]
+
+    # ID display lines projected from the entries, in file order (multi-line entries span several lines)
+    def display_lines(self) -> List[str]:
+        return [
+            line for name in SECTIONS for entry in self.sections[name].entries for line in entry[:-1].split("\n")
+        ]
+
+    # Master IDs of the 'master (unique)' approvals, in file order
+    def approved_masters(self) -> List[str]:
+        return [entry.rpartition(" (")[0] for entry in self.entries("APPROVALS") if " (" in entry]
+
+    # Entry counts per section
+    def counts(self) -> Dict[str, int]:
+        return {name: len(section.entries) for name, section in self.sections.items()}
+
+    # Line offset of 'section' header within the file
+    def offset(self, section: str) -> int:
+        offset = len(self.preamble)
+        for name in SECTIONS:
+            if name == section:
+                return offset
+            offset += self.sections[name].line_count()
+        raise KeyError(section)
+
+    # File lines in exactly the on-disk layout
+    def lines(self) -> List[str]:
+        lines = list(self.preamble)
+        for name in SECTIONS:
+            lines.extend(self.sections[name].lines())
+        return lines
+
+    # File content in exactly the on-disk layout
+    def serialize(self) -> str:
+        return "".join(self.lines())
+
+
+# Size & modification time of 'filepath', to notice edits made outside the app
+def file_signature(filepath: str) -> tuple:
+    info = stat(filepath)
+    return info.st_size, info.st_mtime_ns
@@ -0,0 +1,170 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from hashlib import blake2b
+from json import dumps, loads, JSONDecodeError
+from logging import debug, warning
+from os import fsync, listdir, makedirs, path, replace, stat
+from threading import RLock
+from typing import List, Optional, Tuple
+from document import ApprovalsDocument
+from metrics import Metrics
+
+
+# Suffix of the daily approvals files, named '<%Y.%m.%d>.approvals.txt' so name order is day order
+APPROVALS_SUFFIX = ".approvals.txt"
+
+# Bits of each history key holding the file number, the rest hold the approval's hash
+FILE_BITS = 16
+FILE_MASK = (1 << FILE_BITS) - 1
+
+
+# 48-bit hash of an approval, shifted above the file number bits
+def approval_hash(text: str) -> int:
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=6).digest(), "big") << FILE_BITS
+
+
+# Approvals of one approvals file, none when it can't be read or parsed
+def read_approvals(filepath: str) -> List[str]:
+    try:
+        with open(filepath, "r") as file:
+            return ApprovalsDocument.parse(file.readlines()).entries("APPROVALS")
+    except (OSError, IOError, ValueError) as e:
+        warning(f"Skipping approvals file {filepath} in duplicate index: {e}")
+        return []
+
+
+# Combined 'master (unique)' IDs approved before, to flag a repeat at capture time: today's approvals are counted
+# in a hash multiset & the working directory's earlier approvals files in a sorted array of 64-bit keys
+# (48-bit approval hash + file number), searched by bisection; the array is cached under 'cache_dir'
+# with each file's size & mtime so only files added or changed since are parsed again
+class DuplicateIndex:
+    def __init__(self, directory: str, today_file: str, cache_dir: str) -> None:
+        self.directory = directory
+        # Today's approvals file, kept out of the history
+        self.today_file = path.basename(today_file)
+        self.cache_path = path.join(
+            cache_dir, blake2b(directory.encode("utf-8"), digest_size=8).hexdigest() + ".idx"
+        )
+        # Today's approvals & the document they were counted from
+        self._today = Counter()
+        self._document = None
+        # Earlier files, oldest first, & their sorted keys, loaded on first use
+        self._files: Optional[List[Tuple[str, int, int]]] = None
+        self._keys = array("Q")
+        self._lock = RLock()
+        # Lookups, repeats found today & on earlier days, files parsed & cache writes
+        self.metrics = Metrics()
+
+    # Count today's approvals from 'document' whenever it is replaced, e.g. by a restored 'state'
+    def watch(self, document: ApprovalsDocument) -> None:
+        if document is not self._document:
+            self._today = Counter(document.entries("APPROVALS"))
+            self._document = document
+
+    # Keep today's count in step with inserts & removals of the watched document
+    def add(self, text: str) -> None:
+        self._today[text] += 1
+
+    def discard(self, text: str) -> None:
+        if self._today[text] <= 1:
+            self._today.pop(text, None)
+        else:
+            self._today[text] -= 1
+
+    # Approvals file 'text' was approved in before, newest first (today's first), None when it's new
+    def lookup(self, text: str) -> Optional[str]:
+        self.metrics.incr("lookups")
+        if text in self._today:
+            self.metrics.incr("today_repeats")
+            return self.today_file
+
+        self.load()
+        key = approval_hash(text)
+        position = bisect_left(self._keys, key)
+        found = None
+        # Keys of the same hash are ordered by file number, the last one is the newest file
+        while position < len(self._keys) and self._keys[position] & ~FILE_MASK == key:
+            found = self._keys[position] & FILE_MASK
+            position += 1
+        if found is None:
+            return None
+        self.metrics.incr("history_repeats")
+        return self._files[found][0]
+
+    # Approvals files of the directory other than today's, with size & mtime
+    def _scan(self) -> List[Tuple[str, int, int]]:
+        files = []
+        for name in sorted(listdir(self.directory)):
+            if name.endswith(APPROVALS_SUFFIX) and name != self.today_file:
+                status = stat(path.join(self.directory, name))
+                files.append((name, status.st_size, status.st_mtime_ns))
+        return files[-FILE_MASK:]
+
+    # Bring the history up to date with the directory, parsing only files the cache doesn't match
+    def load(self) -> None:
+        if self._files is not None:
+            return
+        with self._lock:
+            if self._files is not None:
+                return
+            files = self._scan()
+            cached_files, keys = self._read_cache()
+            if cached_files == files:
+                self._files, self._keys = files, keys
+                debug(f"Duplicate index: {len(keys)} approvals of {len(files)} files from cache")
+                return
+
+            # Keep keys of unchanged files, renumbered to their new position, & parse the rest
+            numbers = {entry: number for number, entry in enumerate(files)}
+            renumber = {
+                number: numbers[entry] for number, entry in enumerate(cached_files) if entry in numbers
+            }
+            merged = [key & ~FILE_MASK | renumber[key & FILE_MASK] for key in keys if key & FILE_MASK in renumber]
+            kept = set(renumber.values())
+            for number, (name, _, _) in enumerate(files):
+                if number not in kept:
+                    approvals = read_approvals(path.join(self.directory, name))
+                    merged.extend(approval_hash(text) | number for text in approvals)
+                    self.metrics.incr("parsed_files")
+            merged.sort()
+
+            self._files, self._keys = files, array("Q", merged)
+            self._write_cache()
+            debug(f"Duplicate index: {len(merged)} approvals of {len(files)} files, "
+                  f"{len(files) - len(kept)} parsed")
+
+    # Cached file list & keys, empty when missing, unreadable or written for another layout
+    def _read_cache(self) -> Tuple[List[Tuple[str, int, int]], array]:
+        keys = array("Q")
+        try:
+            with open(self.cache_path, "rb") as file:
+                header = loads(file.readline())
+                keys.frombytes(file.read())
+            if header.get("directory") != self.directory or len(keys) != header.get("keys"):
+                return [], array("Q")
+            return [tuple(entry) for entry in header["files"]], keys
+        except (OSError, IOError, ValueError, JSONDecodeError, KeyError, TypeError):
+            return [], array("Q")
+
+    # Write the file list & keys atomically, a crash mid-write keeps the previous cache
+    def _write_cache(self) -> None:
+        try:
+            makedirs(path.dirname(self.cache_path), exist_ok=True)
+            temporary = f"{self.cache_path}.tmp"
+            header = {"directory": self.directory, "files": self._files, "keys": len(self._keys)}
+            with open(temporary, "wb") as file:
+                file.write(dumps(header).encode("utf-8") + b"\n")
+                file.write(self._keys.tobytes())
+                file.flush()
+                fsync(file.fileno())
+            replace(temporary, self.cache_path)
+            self.metrics.incr("cache_writes")
+        except (OSError, IOError) as e:
+            warning(f"Couldn't write duplicate index cache {self.cache_path}: {e}")
+
+    # Lookup & load counters with the index size
+    def stats(self) -> dict:
+        stats = self.metrics.snapshot()
+        stats.update({"today": len(self._today), "history": len(self._keys), "files": len(self._files or ())})
+        return stats
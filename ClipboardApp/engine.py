@@ -0,0 +1,700 @@
+from datetime import datetime
+from heapq import heappush, heappop
+from json import dumps, JSONDecodeError
+from logging import info, debug, warning, error
+from os import path, makedirs, chdir, getcwd
+from threading import Lock
+from time import monotonic
+from traceback import format_exc
+from typing import Callable, Dict, List, Optional, Tuple
+from autosave import AutosaveService
+from history import HistoryStack, HistoryLog, new_action, complete_action
+from masters import MasterIndex
+from duplicates import DuplicateIndex
+from journal import (
+    load_document, has_document, initialize_document, materialize, record_insert, record_insert_many, record_remove,
+    record_snapshot
+)
+from persist import WriteTracker
+from store import StateStore, DataDirectoryLock
+from writer import FileWriter, submit_io, io_barrier
+
+
+# Events emitted by 'Engine' & their arguments:
+#   'appended'   (texts)      entries added to the document, in insertion order
+#   'removed'    (text)       entry taken out again by undo
+#   'reset'      (lines)      document replaced, 'lines' as the ID display shows them
+#   'counter'    (count)      unique master ID counter changed
+#   'last_entry' (entry)      last processed entry changed
+#   'history'    ()           undo/redo availability may have changed
+#   'directory'  (directory)  working directory changed
+#   'duplicate'  (text, file) approval 'text' was approved before, in approvals file 'file'
+#   'status'     (message)    something the user should know that needs no answer, e.g. a skipped undo
+EVENTS = ("appended", "removed", "reset", "counter", "last_entry", "history", "directory", "duplicate", "status")
+
+
+# Stand-in for the Tk root's 'after' & 'after_cancel' when running headless, due callbacks run on the caller's
+# thread from 'run_due'; writer completions without a UI queue schedule from the writer thread, hence the lock
+class Scheduler:
+    def __init__(self) -> None:
+        self._due = []
+        self._jobs = {}
+        self._next_job = 0
+        self._lock = Lock()
+
+    def after(self, delay: int, callback: Callable, *args) -> int:
+        with self._lock:
+            self._next_job += 1
+            self._jobs[self._next_job] = (callback, args)
+            heappush(self._due, (monotonic() + delay / 1000, self._next_job))
+            return self._next_job
+
+    def after_cancel(self, job: int) -> None:
+        with self._lock:
+            self._jobs.pop(job, None)
+
+    # Run callbacks whose delay elapsed (all pending ones when 'everything'), return how many ran
+    def run_due(self, everything: bool = False) -> int:
+        ran = 0
+        while True:
+            with self._lock:
+                if not self._due or not (everything or self._due[0][0] <= monotonic()):
+                    return ran
+                _, job = heappop(self._due)
+                entry = self._jobs.pop(job, None)
+            if entry is not None:
+                callback, args = entry
+                callback(*args)
+                ran += 1
+
+
+# UI-free core of the clipboard manager: owns the approvals document & its section inserts, undo/redo,
+# the unique master ID counter & persistence of state & history; front ends listen to 'EVENTS'
+class Engine:
+    def __init__(self, root, app_data_dir: str, writer: Optional[FileWriter] = None) -> None:
+        # Tk root in the app, a 'Scheduler' headless; debounced file & state writes are scheduled on it
+        self.root = root
+        # Saved application 'state', history log & spilled history live here
+        self.app_data_dir = app_data_dir
+        # Held until 'close' & taken before the history stacks clear leftover spill files,
+        # raises 'DataDirectoryLocked' while another app or batch run uses 'app_data_dir'
+        self.lock = DataDirectoryLock(app_data_dir)
+        self.lock.acquire()
+        # Master ID set by user
+        self.master_id = None
+        # Counter for unique master IDs
+        self.master_id_counter = 0
+        # Variable for duplicate entry
+        self.last_processed_entry = None
+        # Working directory the approvals file is written to
+        self.working_directory = getcwd()
+        # Undo/redo history budget: actions & bytes kept in memory, 'spill' to disk or 'evict' beyond it
+        self.history_max_actions = 500
+        self.history_max_bytes = 512 * 1024
+        self.history_policy = "spill"
+        history_dir = path.join(app_data_dir, "history")
+        # Undo functionality stack
+        self.undo_stack = HistoryStack(
+            "undo", self.history_max_actions, self.history_max_bytes, self.history_policy, history_dir
+        )
+        # Redo functionality stack
+        self.redo_stack = HistoryStack(
+            "redo", self.history_max_actions, self.history_max_bytes, self.history_policy, history_dir
+        )
+        # Append-only log of undo/redo pushes & pops, opened by 'load_stack_states'
+        self.history_log = None
+        # Saved application 'state' & history, read once by 'load_application_state'
+        self.store = None
+        # Grab current date & format
+        self.current_date = datetime.now().strftime("%Y.%m.%d")
+        # Unique master IDs counted today & on earlier days, persisted so restarts don't count them again
+        self.unique_master_ids = MasterIndex(
+            path.join(app_data_dir, "master_ids.log"), self.current_date, writer=writer
+        )
+        # Create filepath
+        self.filepath = f"{self.current_date}.approvals.txt"
+        # Approvals of today & earlier files in the working directory, to flag repeats; made by 'duplicate_index'
+        self.duplicates = None
+        # Repeats found while appending, flagged once the batch is appended
+        self.pending_repeats = []
+        # Section-indexed model of the approvals file, with its path & on-disk signature
+        self.document = None
+        self.document_path = None
+        self.document_signature = None
+        # Write-ahead journal kept next to the approvals file & its fsync batching
+        self.journal = None
+        self.journal_batch_size = 32
+        self.journal_fsync_interval = 1.0
+        # Debounce (ms) before the approvals file is regenerated from the journal
+        self.materialize_delay = 2000
+        self.materialize_job = None
+        # Writer thread owning approvals file & journal I/O, None writes inline
+        self.writer = writer
+        # Content hashes of persisted files, unchanged bytes are never rewritten
+        self.write_tracker = WriteTracker()
+        # Background autosave of the application 'state' & its debounce (ms) after the last change
+        self.autosave = None
+        self.autosave_delay = 2000
+        # Callbacks per event
+        self._listeners: Dict[str, List[Callable]] = {event: [] for event in EVENTS}
+
+    # Call 'callback' on every 'event', see 'EVENTS'
+    def on(self, event: str, callback: Callable) -> None:
+        self._listeners[event].append(callback)
+
+    def emit(self, event: str, *args) -> None:
+        for callback in self._listeners[event]:
+            callback(*args)
+
+
+    ## Lifecycle ##
+    # Restore saved state & history, then autosave from here on
+    def open(self) -> None:
+        self.load_application_state()
+        self.load_stack_states()
+        self.start_autosave()
+        self.prepare_duplicate_index()
+
+    # Flush everything to disk: final state, history & the approvals file, closing the journal behind them
+    def close(self) -> None:
+        # Stop autosave, the final state is saved synchronously below
+        self.stop_autosave()
+
+        # Regenerate approvals file from the journal & wait for every queued write before anything reads it
+        if self.journal is not None:
+            materialize(self)
+            io_barrier(self)
+
+        if path.isfile(self.filepath):
+            debug(f"Engine closing, file exists, filepath: {self.filepath}")
+            self.save_application_state()
+            self.save_stack_states()
+            debug(f"History stats: {self.history_stats()}")
+            if self.duplicates is not None:
+                info(f"Duplicate index stats: {self.duplicates.stats()}")
+            info(f"Write stats: {self.write_tracker.metrics.snapshot()}")
+        else:
+            debug("Engine closing, file does not exist")
+
+        # Close the journal behind any write queued while saving
+        if self.journal is not None:
+            submit_io(self, self.journal.close)
+        self.unique_master_ids.close()
+        debug(f"Master ID index stats: {self.unique_master_ids.metrics.snapshot()}")
+
+        # Let the next app or batch run have the data directory, once every write above is done
+        io_barrier(self)
+        self.lock.release()
+
+    # Switch to 'directory', the approvals file is relative to it
+    def set_working_directory(self, directory: str) -> None:
+        chdir(path=directory)
+        self.working_directory = directory
+        debug(f'set_working_directory to: {self.working_directory}')
+        self.emit("directory", self.working_directory)
+        self.schedule_autosave()
+        self.prepare_duplicate_index()
+
+
+    ## Duplicate approvals ##
+    # Duplicate index of the working directory & today's file, made again when either changes
+    def duplicate_index(self) -> DuplicateIndex:
+        directory = getcwd()
+        if self.duplicates is None or self.duplicates.directory != directory or \
+                self.duplicates.today_file != path.basename(self.filepath):
+            self.duplicates = DuplicateIndex(directory, self.filepath, path.join(self.app_data_dir, "duplicates"))
+        return self.duplicates
+
+    # Read earlier approvals files on the writer thread, ahead of the first capture
+    def prepare_duplicate_index(self) -> None:
+        submit_io(self, self.duplicate_index().load)
+
+
+    ## Appending entries ##
+    # Append 'text' under 'section', return its undo record
+    def append_entry(self, text: str, section: str) -> Optional[dict]:
+        actions = self.append(texts=[text], section=section)
+        return actions[0] if actions else None
+
+    # Append 'texts' under 'section' with one journal write, keeping one undo record per entry unless not 'undoable';
+    # 'apply' runs before each entry's record is pushed so its counter & last-entry changes are in the logged record
+    def append(self, texts: List[str], section: str, apply: Optional[Callable[[str, Optional[dict]], None]] = None,
+               undoable: bool = True) -> List[dict]:
+        # Create file name
+        current_time = datetime.now()
+        formatted_time = current_time.strftime("%Y.%m.%d")
+        self.filepath = f"{formatted_time}.approvals.txt"
+
+        # Check if file exists & write it from the journal (or empty sections) if not
+        if not path.exists(self.filepath):
+            initialize_document(self)
+
+        actions = []
+        try:
+            # Count today's approvals before these are inserted, repeats are looked up against them
+            duplicates = self.duplicate_index() if section == "APPROVALS" else None
+            if duplicates is not None:
+                duplicates.watch(load_document(self))
+
+            # Insert new entries under correct header in O(1) & append them to the journal in one write,
+            # the text file itself is regenerated on a debounce timer
+            indexes = record_insert_many(self, section, texts)
+
+            for text, index in zip(texts, indexes):
+                # Push undo record holding only this insert's delta
+                action = new_action(self, section, index, text) if undoable else None
+                if apply is not None:
+                    apply(text, action)
+                if action is not None:
+                    self.undo_stack.append(action)
+                    actions.append(action)
+                if duplicates is not None:
+                    duplicates.add(text)
+
+                # Log that text was appended to file
+                info(f"Appended to file: {text}")
+
+            # Clear 'redo_stack' since a new action was taken
+            self.redo_stack.clear()
+
+            # Snapshot application 'state' once this burst of appends settles
+            self.schedule_autosave()
+
+            self.emit("appended", texts)
+
+        # Handle file related exceptions
+        except (OSError, IOError) as e:
+            error(f"An exception occurred while appending to the file: {e}")
+            error(format_exc())
+
+        except Exception as e:
+            error(f"An unexpected exception occurred while appending to the file: {e}")
+            error(format_exc())
+
+        self.emit("history")
+        return actions
+
+    # Combine captured IDs with the master ID & append them: one file write, one undo record per ID if 'undoable'
+    def process_master_ids(self, unique_ids: List[str], undoable: bool = True) -> None:
+        debug(f"process_master_ids called with {len(unique_ids)} unique IDs")
+        try:
+            # Combine master ID with each unique ID
+            combined_ids = [f"{self.master_id} ({unique_id})" for unique_id in unique_ids]
+            info(f"Processing identifiers: {', '.join(combined_ids)}")
+
+            # Append combined ids, updating counter & last entry after each one
+            self.append(texts=combined_ids, section="APPROVALS", apply=self.record_processed_entry, undoable=undoable)
+
+            # Flag repeats once they are appended (& displayed)
+            repeats, self.pending_repeats = self.pending_repeats, []
+            for combined_id, filename in repeats:
+                self.emit("duplicate", combined_id, filename)
+
+        except Exception as e:
+            error(f"Error processing identifier: {e}")
+
+    # Update last entry & unique master ID counter for 'combined_id' & record the changes in its undo delta
+    def record_processed_entry(self, combined_id: str, action: Optional[dict]) -> None:
+        # Store the last processed entry
+        self.last_processed_entry = combined_id
+        self.emit("last_entry", combined_id)
+
+        # Look 'combined_id' up among today's earlier approvals & earlier days' files
+        filename = self.duplicates.lookup(combined_id) if self.duplicates is not None else None
+        if filename is not None:
+            info(f"Duplicate approval: {combined_id} is already in {filename}")
+            self.pending_repeats.append((combined_id, filename))
+
+        # Check if master ID is unique & update unique id counter
+        new_master_id = None
+        if self.master_id not in self.unique_master_ids:
+            self.unique_master_ids.add(self.master_id)
+            self.master_id_counter += 1
+            self.emit("counter", self.master_id_counter)
+            new_master_id = self.master_id
+
+        # Record counter & last-entry changes in the undo delta
+        complete_action(self, action, new_master_id)
+
+    # Append the last processed entry again, once; return its undo record
+    def duplicate_last_entry(self) -> Optional[dict]:
+        if self.last_processed_entry is None:
+            return None
+        info(f"Duplicated entry: {self.last_processed_entry}")
+        actions = self.append(texts=[self.last_processed_entry], section="APPROVALS", apply=self.record_duplicate_entry)
+        return actions[0] if actions else None
+
+    # Reset 'last_processed_entry' so an entry is duplicated once & record it in the undo delta
+    def record_duplicate_entry(self, text: str, action: Optional[dict]) -> None:
+        self.last_processed_entry = None
+        complete_action(self, action)
+
+
+    ## Undo & redo ##
+    # Saved history not loaded yet may hold actions for either direction
+    @property
+    def history_pending(self) -> bool:
+        return self.history_log is not None and self.history_log.deferred
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack) or self.history_pending
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack) or self.history_pending
+
+    # Undo previous action by applying the inverse of its delta
+    def undo(self) -> None:
+        # Load saved history on first use
+        self.load_history()
+
+        if self.undo_stack:
+            # Pop last action, it moves to 'redo_stack' once its entry is removed
+            action = self.undo_stack.pop()
+            debug(f"Undo: Reverting action: {action} Length of 'undo_stack': {len(self.undo_stack)}")
+
+            # Remove inserted entry from document & journal, located before anything changes
+            try:
+                record_remove(self, action["section"], action["index"], action["text"])
+            except ValueError:
+                # Entry was deleted from the approvals file outside the app, drop its record
+                warning(f"Undo: {action['text']!r} is no longer in {self.filepath}, dropping its undo record")
+                self.emit("status", f"Undo skipped, {action['text']} is no longer in the file")
+                self.emit("history")
+                return
+            self.redo_stack.append(action)
+            if action["section"] == "APPROVALS" and self.duplicates is not None:
+                self.duplicates.discard(action["text"])
+            self.emit("removed", action["text"])
+
+            # Restore counter, unique master IDs & last processed entry
+            self.master_id_counter = action["counter"][0]
+            if action["master_id"] is not None:
+                self.unique_master_ids.discard(action["master_id"])
+            self.emit("counter", self.master_id_counter)
+            self.last_processed_entry = action["last_entry"][0]
+            self.emit("last_entry", self.last_processed_entry)
+            self.schedule_autosave()
+            info("Undid last action")
+
+        # Log sizes of 'undo_stack' & 'redo_stack' after undo action
+        debug(f"After undo action: 'Undo_stack' size: {len(self.undo_stack)}, 'Redo_stack' size: {len(self.redo_stack)}")
+        self.emit("history")
+
+    # Redo previous action by re-applying its delta
+    def redo(self) -> None:
+        # Load saved history on first use
+        self.load_history()
+
+        if self.redo_stack:
+            # Pop next action, re-insert its entry into document & journal & move it to 'undo_stack'
+            action = self.redo_stack.pop()
+            debug(f"Redo: Re-applying action: {action}")
+            action["index"] = record_insert(self, action["section"], action["text"])
+            if action["section"] == "APPROVALS" and self.duplicates is not None:
+                self.duplicates.add(action["text"])
+            self.undo_stack.append(action)
+            self.emit("appended", [action["text"]])
+
+            # Re-apply counter, unique master IDs & last processed entry
+            self.master_id_counter = action["counter"][1]
+            if action["master_id"] is not None:
+                self.unique_master_ids.add(action["master_id"])
+            self.emit("counter", self.master_id_counter)
+            self.last_processed_entry = action["last_entry"][1]
+            self.emit("last_entry", self.last_processed_entry)
+            self.schedule_autosave()
+
+            # Log successful 'redo' action
+            info("Redid last action")
+
+        # After redo action, check if 'redo_stack' is empty & update button states
+        debug(f"After redo action: 'Undo_stack' size: {len(self.undo_stack)}, 'Redo_stack' size: {len(self.redo_stack)}")
+        self.emit("history")
+
+
+    ## Application 'state' ##
+    # Save current state of the approvals file
+    def save_current_state(self, filepath: str) -> Optional[Tuple[list, int, Optional[str], Optional[str], Optional[str]]]:
+        try:
+            # Check if 'filepath' exists
+            if not path.exists(filepath):
+                error(f"File not found: {filepath}")
+                return None
+
+            # Save 'file_state' from the journaled document, the file itself may not be materialized yet
+            file_state = load_document(self).lines()
+
+            # Return 'file_state', 'master_id_counter', & 'last_processed_entry',
+            # the text display is derived from 'file_state' so it isn't saved
+            return file_state, self.master_id_counter, self.last_processed_entry, self.working_directory, \
+                self.current_date
+
+        # Handle file related errors
+        except (OSError, IOError) as e:
+            error(f"An exception occurred while saving txt file's current state: {e}")
+            error(format_exc())
+
+        # Handle any other unexpected errors
+        except Exception as e:
+            error(f"An unexpected exception occurred while saving txt file's current state: {e}")
+            error(format_exc())
+
+    # Path of the saved application 'state' data file
+    def application_state_path(self) -> str:
+        return path.join(self.app_data_dir, 'application_state_data.json')
+
+    # Application 'state' data for persistence, None until today's file exists
+    def application_state(self) -> Optional[dict]:
+        if not path.exists(self.filepath):
+            return None
+
+        # Capture current 'state' of file, counter, and last processed entry
+        current_state = self.save_current_state(self.filepath)
+        if current_state is None:
+            return None
+        file_state, master_id_counter_state, last_processed_entry, working_directory, \
+            current_date = current_state
+
+        # Prepare 'application_state' data for saving
+        return {
+            'file_state': file_state,
+            'master_id_counter_state': master_id_counter_state,
+            'duplicate_entry_stack_state': last_processed_entry,
+            'working_directory_state': working_directory,
+            'current_date': current_date,
+        }
+
+    # Save application 'state' data for persistence
+    def save_application_state(self) -> None:
+        try:
+            # Determine directory 'application_state' will be saved in & create if needed
+            makedirs(self.app_data_dir, exist_ok=True)
+            filepath = self.application_state_path()
+
+            state = self.application_state()
+            if state is None:
+                return
+
+            # Save 'application_state' data to JSON file atomically, a crash mid-write keeps the previous file;
+            # nothing is written when the saved file already holds these bytes
+            if self.write_tracker.write(filepath, dumps(state)):
+                # Log successful save of 'application_state'
+                debug(f"All states saved to: {filepath}.")
+
+        except (OSError, IOError) as e:
+            # Handle file related errors
+            error(f"An exception occurred while saving application state: {e}")
+            error(format_exc())
+
+        except Exception as e:
+            # Handle unexpected errors
+            error(f"An unexpected exception occurred while saving application state: {e}")
+            error(format_exc())
+
+    # Start background autosave of the application 'state'
+    def start_autosave(self) -> None:
+        makedirs(self.app_data_dir, exist_ok=True)
+        self.autosave = AutosaveService(
+            self.root, self.application_state_path(), self.application_state, self.autosave_delay, self.write_tracker
+        )
+
+    # Mark application 'state' changed, autosave snapshots it once changes settle
+    def schedule_autosave(self) -> None:
+        if self.autosave is not None:
+            self.autosave.mark_dirty()
+
+    # Stop background autosave & log its write counts for the session
+    def stop_autosave(self) -> None:
+        if self.autosave is not None:
+            self.autosave.stop()
+            info(f"Autosave stats: {self.autosave.metrics.snapshot()}")
+            self.autosave = None
+
+    # Restore content of the approvals file, counter & last entry to a previously saved 'state'
+    def restore_application_state(self, state: Tuple) -> None:
+        try:
+            # Check if 'state' is None
+            if state is None:
+                error("Cannot restore state: 'state' is None")
+                return
+
+            # Unpack tuple of 'application_state' data
+            file_state, master_id_counter, last_processed_entry, working_directory, current_date = state
+
+            # Restore & switch working directory first, 'filepath' is relative to it
+            if working_directory:
+                chdir(path=working_directory)
+            self.working_directory = getcwd()
+            self.emit("directory", self.working_directory)
+
+            # The journal (or the approvals file) is newer than the debounced 'file_state' & is kept after a crash;
+            # 'file_state' only seeds a document that has neither, the file is regenerated on a debounce
+            if file_state and not has_document(self):
+                record_snapshot(self, file_state)
+
+            # Display is derived from the document
+            self.emit("reset", load_document(self).display_lines())
+
+            # Saved before the master ID index existed: count today's masters from the approvals once
+            if master_id_counter and not path.exists(self.unique_master_ids.filepath):
+                self.unique_master_ids.update(load_document(self).approved_masters())
+
+            # Update master ID counter from the index rather than the debounced 'master_id_counter'
+            self.restore_master_id_counter()
+
+            # Restore last processed entry
+            self.last_processed_entry = last_processed_entry
+            self.emit("history")
+
+            # Restore value of 'current_date' attribute
+            self.current_date = current_date
+
+        except (OSError, IOError) as e:
+            # Handle file-related errors
+            error(f"An exception occurred while restoring content of txt file & txt display: {e}")
+            error(format_exc())
+
+        except Exception as e:
+            # Handle any other unexpected errors
+            error(f"An unexpected exception occurred while restoring content of txt file & txt display: {e}")
+            error(format_exc())
+
+    # Unique master ID counter from today's master IDs in the index, written as each is counted so a crash
+    # can't leave it behind like the autosaved counter
+    def restore_master_id_counter(self) -> None:
+        self.master_id_counter = len(self.unique_master_ids)
+        self.emit("counter", self.master_id_counter)
+
+    # Load last 'state' of application, reading the saved 'state' file once
+    def load_application_state(self) -> bool:
+        # Saved 'state' & history of today, date validated once by the store
+        self.store = StateStore(self.app_data_dir, datetime.now().strftime('%Y.%m.%d'))
+
+        try:
+            state = self.store.load()
+            if state is None:
+                # Nothing autosaved yet, masters counted before a crash are still in the index
+                self.restore_master_id_counter()
+                return False
+
+            # Restore today's saved states, or clear all states when they belong to another day
+            if not self.store.current:
+                state = {}
+            self.restore_application_state((
+                state.get('file_state', []),
+                state.get('master_id_counter_state', 0),
+                state.get('last_processed_entry', None),
+                state.get('working_directory_state', None),
+                self.store.saved_date if self.store.current else None
+            ))
+
+            # Undo history holds deltas only, it is restored by 'load_stack_states'
+            self.undo_stack.clear()
+            self.emit("history")
+
+            # Log application loaded
+            debug(f"Date {'not ' if self.store.current else 'is '}different, application loaded")
+
+            return True
+
+        # Handle exceptions
+        except (OSError, IOError, JSONDecodeError) as e:
+            error(f"An exception occurred when restoring application state {e}")
+            error(format_exc())
+
+        except Exception as e:
+            error(f"An unexpected exception occurred when restoring application state {e}")
+            error(format_exc())
+
+        return False
+
+
+    ## Undo/redo history persistence ##
+    # Memory use & spill counts of the undo & redo history
+    def history_stats(self) -> dict:
+        return {"undo": self.undo_stack.stats(), "redo": self.redo_stack.stats()}
+
+    # Persist stack 'states' (undo/redo), every push & pop is already in the history log so only fsync is left
+    def save_stack_states(self) -> None:
+        try:
+            if self.history_log is not None:
+                self.history_log.close()
+                debug(f"Stacks state synced to {self.history_log.filepath}.")
+
+        except (OSError, IOError) as e:
+            # Handle file related errors
+            error(f"An exception occurred while saving current stack states: {e}")
+            error(format_exc())
+
+        except Exception as e:
+            # Handle unexpected errors
+            error(f"An unexpected exception occurred while saving current stack states: {e}")
+            error(format_exc())
+
+    # Open history log for stack 'states' (undo & redo), today's saved history is replayed on first undo/redo
+    def load_stack_states(self) -> bool:
+        try:
+            # Read saved 'state' first when the caller skipped it, the store knows the log's path & day
+            if self.store is None:
+                self.store = StateStore(self.app_data_dir, datetime.now().strftime('%Y.%m.%d'))
+
+            # Determine directory & filepath for the history log
+            makedirs(path.dirname(self.store.log_path), exist_ok=True)
+            self.history_log = HistoryLog(self.store.log_path, self.store.date, writer=self.writer)
+
+            if self.store.history_pending(self.history_log):
+                # Log new pushes & pops on top of the saved history without reading it yet
+                self.history_log.attach_deferred(self.undo_stack, self.redo_stack)
+                debug("Saved history found, it is loaded on first undo/redo")
+            else:
+                # Import today's stacks from the old JSON dump the first time, otherwise start a new history
+                stacks_state = self.store.load_legacy_history()
+                self.restore_stacks(stacks_state)
+                self.history_log.attach(self.undo_stack, self.redo_stack)
+
+            # Update undo/redo availability based on loaded stacks
+            self.emit("history")
+
+            return True
+
+        # Handle file related & JSON decoding errors
+        except (OSError, IOError, JSONDecodeError, FileNotFoundError) as e:
+            error(f"An error occurred while loading saved stack states: {e}")
+            return False
+
+        # Handle unexpected errors
+        except Exception as e:
+            error(f"An unexpected error occurred while loading saved stack states: {e}")
+            return False
+
+    # Refill undo & redo stacks from saved 'stacks_state', dropping snapshots saved by older versions
+    def restore_stacks(self, stacks_state: dict) -> None:
+        self.undo_stack.clear()
+        self.undo_stack.extend(action for action in stacks_state.get('undo', stacks_state.get('undo_stack', []))
+                               if isinstance(action, dict))
+        self.redo_stack.clear()
+        self.redo_stack.extend(action for action in stacks_state.get('redo', stacks_state.get('redo_stack', []))
+                               if isinstance(action, dict))
+
+        # Log number of items loaded into each stack
+        debug(f"Loaded undo_stack with {len(self.undo_stack)} items & redo_stack with {len(self.redo_stack)} items.")
+
+    # Replay the deferred history log on first undo/redo, it already holds this session's pushes & pops
+    def load_history(self) -> None:
+        if not self.history_pending:
+            return
+
+        try:
+            # Detach stacks so refilling them isn't logged again, & let the writer finish the log before reading it
+            self.history_log.close()
+            io_barrier(self)
+            self.undo_stack.log = self.redo_stack.log = None
+            self.restore_stacks(self.history_log.replay())
+            self.history_log.deferred = False
+            self.history_log.attach(self.undo_stack, self.redo_stack)
+
+        except (OSError, IOError) as e:
+            error(f"An exception occurred while loading undo history: {e}")
+            error(format_exc())
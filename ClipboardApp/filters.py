@@ -0,0 +1,64 @@
+from logging import info
+from re import compile
+from string import ascii_letters, digits
+from typing import Iterable, Optional
+from metrics import Metrics
+
+
+# Default unique ID format: letters & digits, optionally joined by '.', '_' or '-'
+DEFAULT_ID_PATTERNS = (r"[A-Za-z0-9]+(?:[._-][A-Za-z0-9]+)*",)
+
+# Characters allowed anywhere in an ID
+DEFAULT_ID_CHARSET = ascii_letters + digits + "._-"
+
+
+# Cheap checks that keep non-ID clipboard content (emails, URLs, paragraphs) off the capture path
+class IdFilter:
+    def __init__(self, patterns: Iterable[str] = DEFAULT_ID_PATTERNS, min_length: int = 1,
+                 max_length: int = 64, charset: Optional[str] = DEFAULT_ID_CHARSET) -> None:
+        # Precompile patterns once, matched against the whole candidate
+        self.patterns = [compile(pattern) for pattern in patterns]
+        self.min_length = min_length
+        self.max_length = max_length
+        # Allowed characters, None accepts any character
+        self.charset = frozenset(charset) if charset is not None else None
+        # Accepted & rejected counts, rejections split by reason
+        self.metrics = Metrics()
+        self.last_rejection = None
+
+    # Filter from the 'id_patterns', 'id_min_length', 'id_max_length' & 'id_charset' settings of 'config';
+    # custom patterns accept any character unless 'id_charset' is set as well
+    @classmethod
+    def from_config(cls, config: dict) -> "IdFilter":
+        patterns = config.get("id_patterns", DEFAULT_ID_PATTERNS)
+        return cls(
+            [patterns] if isinstance(patterns, str) else patterns,
+            config.get("id_min_length", 1),
+            config.get("id_max_length", 64),
+            config.get("id_charset", DEFAULT_ID_CHARSET if "id_patterns" not in config else None),
+        )
+
+    # Check if 'text' looks like an ID, cheapest checks first
+    def accept(self, text: str) -> bool:
+        # Length check is O(1)
+        if not self.min_length <= len(text) <= self.max_length:
+            return self._reject("length", text)
+
+        # Charset check runs in C over the whole text, no regex backtracking
+        if self.charset is not None and not self.charset.issuperset(text):
+            return self._reject("charset", text)
+
+        # Any pattern matching the full text accepts it
+        if self.patterns and not any(pattern.fullmatch(text) for pattern in self.patterns):
+            return self._reject("pattern", text)
+
+        self.metrics.incr("accepted")
+        return True
+
+    # Count rejection under 'reason', the reason of the last one is kept for the status bar
+    def _reject(self, reason: str, text: str) -> bool:
+        self.metrics.incr("rejected")
+        self.metrics.incr(f"rejected.{reason}")
+        self.last_rejection = reason
+        info(f"Clipboard content rejected by ID filter ({reason}, {len(text)} characters): {text[:80]!r}")
+        return False
@@ -1,14 +1,14 @@
 from datetime import datetime
-from tkinter import ttk, Text, DISABLED, messagebox
-from ttkthemes import ThemedTk
-from screeninfo import get_monitors
+from tkinter import Tk, ttk, Text, DISABLED
 from context_menu import create_context_menu, highlight_text, bind_context_menu
-from update import open_file, update_directory_label
+from update import update_directory_label
+from display import IdDisplay
 
 
 # Working directory message for .after() method
 def working_directory_msg(app) -> None:
     # Show confirmation message & log the change
+    from tkinter import messagebox
     msg = messagebox.showinfo("Working Directory", "Please set working directory before proceeding.")
 
 
@@ -18,25 +18,13 @@ def set_window_size(app) -> None:
     app.root.resizable(False, False)
 
 
-# Decide if app is the topmost application depending on monitor
-def adjust_topmost(app) -> None:
-    # Get window position
-    x = app.root.winfo_x()
-
-    # Iterate over list of monitors
-    for index, monitor in enumerate(get_monitors()):
-        # Check if top left-most corner of GUI falls between left & right edge of monitor
-        if monitor.x <= x <= monitor.x + monitor.width:
-            # If it's on the second monitor (index > 0), always keep GUI on top
-            if index > 0:
-                app.root.attributes('-topmost', True)
-            else:
-                # If GUI is on the first (primary) monitor, don't
-                app.root.attributes('-topmost', False)
+# '<Configure>' bridge to the topmost decision, made once the window settles on a monitor
+def adjust_topmost(app, event=None) -> None:
+    app.topmost.on_configure(event)
 
 
 # Close application if left open at 5:30pm
-def check_time_and_close(root: ThemedTk, target_hour: int, target_minute: int) -> None:
+def check_time_and_close(root: Tk, target_hour: int, target_minute: int) -> None:
     current_time = datetime.now()
     if current_time.hour == target_hour and current_time.minute >= target_minute:
         root.quit()
@@ -142,6 +130,9 @@ def thread_status_label(app) -> None:
     app.status_label.insert("1.0", "   Status: ", "black")
     app.status_label.insert("end", "STOPPED", "red")
     app.status_label.config(state=DISABLED)
+    # Short-lived messages next to the status, shown by 'show_status'
+    app.status_message = ttk.Label(status_frame, text="", style="Custom.TLabel", foreground="red")
+    app.status_message.grid(row=0, column=1, sticky="w")
 
 
 # Create & place unique master ID counter label
@@ -169,6 +160,10 @@ def id_display(app) -> None:
     app.text_display = Text(master=app.root, height=5, width=30, undo=True)
     app.text_display.grid(row=9, column=0, columnspan=3, padx=10, pady=10, sticky="ew")
     app.text_display.tag_configure(tagName="center", justify="center")
+    # Approvals already in today's or an earlier approvals file
+    app.text_display.tag_configure(tagName="duplicate", foreground="red")
+    # Only the newest entries are rendered, older ones are paged in on scroll
+    app.display = IdDisplay(app.text_display, app.display_capacity)
 
 
 # Create & place note display with a Label
@@ -189,7 +184,7 @@ def set_working_directory_button(app) -> None:
 
 def open_file_button(app) -> None:
     app.open_file_button = ttk.Button(
-        master=app.root, text="Open File", command=open_file
+        master=app.root, text="Open File", command=app.open_file
     )
     app.open_file_button.grid(row=13, column=0, columnspan=3, pady=10)
 
@@ -0,0 +1,352 @@
+from collections import deque
+from json import dumps, loads
+from logging import debug, warning, error
+from os import fsync, listdir, makedirs, path, remove, replace
+from typing import Dict, Iterable, List, Optional
+from journal import encode_record, decode_record
+from metrics import Metrics
+from writer import FileWriter, submit_io
+
+
+# Undo record for one inserted entry, holding only its delta:
+# where it went, plus counter & last-entry values before & after the action
+def new_action(app, section: str, index: int, text: str) -> dict:
+    return {
+        "section": section,
+        "index": index,
+        "text": text,
+        "counter": [app.master_id_counter, app.master_id_counter],
+        "last_entry": [app.last_processed_entry, app.last_processed_entry],
+        "master_id": None,
+    }
+
+
+# Capture counter & last-entry values once the caller finished updating them
+def complete_action(app, action: Optional[dict], new_master_id: Optional[str] = None) -> None:
+    # Append failed, nothing to complete
+    if action is None:
+        return
+    action["counter"][1] = app.master_id_counter
+    action["last_entry"][1] = app.last_processed_entry
+    action["master_id"] = new_master_id
+
+
+# Undo/redo stack with a memory budget; entries over budget are evicted or spilled to on-disk segments
+class HistoryStack:
+    def __init__(self, name: str, max_actions: int = 500, max_bytes: int = 512 * 1024,
+                 policy: str = "spill", spill_dir: Optional[str] = None) -> None:
+        # Stack name, used for segment file names ('undo' / 'redo')
+        self.name = name
+        # In-memory budget
+        self.max_actions = max_actions
+        self.max_bytes = max_bytes
+        # 'spill' pages old entries to disk, 'evict' drops them
+        self.policy = policy if spill_dir is not None else "evict"
+        self.spill_dir = spill_dir
+        # In-memory entries, newest on the right, with their encoded sizes
+        self._entries = deque()
+        self._sizes = deque()
+        self._bytes = 0
+        # Spilled segment files, oldest first, & how many entries each holds
+        self._segments = []
+        self._spilled = 0
+        self._next_segment = 0
+        # Spill, eviction & page-in counters
+        self.metrics = Metrics()
+        # Append-only log every push & pop is recorded in, attached once loaded
+        self.log = None
+        self._remove_segments(stale=True)
+
+    def __len__(self) -> int:
+        return len(self._entries) + self._spilled
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    # Push 'action', then bring memory back under budget
+    def append(self, action: dict) -> None:
+        size = len(dumps(action))
+        self._entries.append(action)
+        self._sizes.append(size)
+        self._bytes += size
+        # Log after the change so a compaction triggered by this record already includes it
+        if self.log is not None:
+            self.log.push(self.name, action)
+        if len(self._entries) > self.max_actions or self._bytes > self.max_bytes:
+            self._enforce_budget()
+
+    # Push many actions, oldest first
+    def extend(self, actions: Iterable[dict]) -> None:
+        actions = list(actions)
+
+        # Loading into an empty, unlogged stack: send everything older than half the budget
+        # straight to disk (or drop it) instead of pushing it through memory first
+        keep = self.max_actions // 2
+        if not self and self.log is None and len(actions) > self.max_actions:
+            older, actions = actions[:-keep], actions[-keep:]
+            if self.policy == "spill":
+                for start in range(0, len(older), keep):
+                    self._spill(older[start:start + keep])
+            else:
+                self.metrics.incr("evicted", len(older))
+
+        for action in actions:
+            self.append(action)
+
+    # Pop newest action, paging the newest spilled segment back in when memory runs dry
+    def pop(self) -> dict:
+        if not self._entries and self._segments:
+            self._page_in()
+        action = self._entries.pop()
+        self._bytes -= self._sizes.pop()
+        if self.log is not None:
+            self.log.pop(self.name)
+        return action
+
+    def clear(self) -> None:
+        # Only log clears that change something, 'redo_stack' is cleared on every new action;
+        # before a deferred log is replayed the stack can't tell, so every clear is logged
+        changed = bool(self) or (self.log is not None and self.log.deferred)
+        self._entries.clear()
+        self._sizes.clear()
+        self._bytes = 0
+        self._remove_segments()
+        if self.log is not None and changed:
+            self.log.clear(self.name)
+
+    # All actions oldest first, spilled ones read from disk without paging them in
+    def to_list(self) -> List[dict]:
+        actions = []
+        for segment, _ in self._segments:
+            with open(segment, "r") as file:
+                actions.extend(loads(line) for line in file)
+        actions.extend(self._entries)
+        return actions
+
+    # Current memory use & spill counts
+    def stats(self) -> dict:
+        stats = {
+            "in_memory": len(self._entries),
+            "memory_bytes": self._bytes,
+            "spilled": self._spilled,
+            "segments": len(self._segments),
+        }
+        stats.update(self.metrics.snapshot())
+        return stats
+
+    # Spill or evict the oldest half of the budget at once so pushes don't thrash the disk
+    def _enforce_budget(self) -> None:
+        target_actions = self.max_actions // 2
+        target_bytes = self.max_bytes // 2
+        chunk = []
+        while self._entries and (len(self._entries) > target_actions or self._bytes > target_bytes):
+            chunk.append(self._entries.popleft())
+            self._bytes -= self._sizes.popleft()
+
+        if self.policy == "spill":
+            try:
+                self._spill(chunk)
+                return
+            except OSError as e:
+                error(f"Spilling {self.name} history failed, evicting instead: {e}")
+        self.metrics.incr("evicted", len(chunk))
+
+    # Write 'chunk' to a new segment file
+    def _spill(self, chunk: List[dict]) -> None:
+        makedirs(self.spill_dir, exist_ok=True)
+        segment = path.join(self.spill_dir, f"{self.name}-{self._next_segment:06d}.jsonl")
+        self._next_segment += 1
+        with open(segment, "w") as file:
+            file.writelines(dumps(action) + "\n" for action in chunk)
+        self._segments.append((segment, len(chunk)))
+        self._spilled += len(chunk)
+        self.metrics.incr("spills")
+        self.metrics.incr("spilled_actions", len(chunk))
+        debug(f"Spilled {len(chunk)} {self.name} actions to {segment}")
+
+    # Read newest segment back into memory & delete it
+    def _page_in(self) -> None:
+        segment, count = self._segments.pop()
+        with open(segment, "r") as file:
+            for line in file:
+                self._entries.append(loads(line))
+                self._sizes.append(len(line) - 1)
+                self._bytes += len(line) - 1
+        remove(segment)
+        self._spilled -= count
+        self.metrics.incr("page_ins")
+        debug(f"Paged {count} {self.name} actions back in from {segment}")
+
+    # Delete this stack's segment files (also leftovers from an earlier session when 'stale')
+    def _remove_segments(self, stale: bool = False) -> None:
+        segments = [segment for segment, _ in self._segments]
+        if stale and self.spill_dir is not None and path.isdir(self.spill_dir):
+            segments = [
+                path.join(self.spill_dir, name) for name in listdir(self.spill_dir)
+                if name.startswith(f"{self.name}-") and name.endswith(".jsonl")
+            ]
+        for segment in segments:
+            try:
+                remove(segment)
+            except OSError as e:
+                warning(f"Could not remove history segment {segment}: {e}")
+        self._segments = []
+        self._spilled = 0
+
+
+# Append-only log of undo/redo pushes & pops, compacted periodically & replayed on startup
+class HistoryLog:
+    def __init__(self, filepath: str, date: str, compact_factor: int = 4, compact_min: int = 1000,
+                 writer: Optional[FileWriter] = None) -> None:
+        self.filepath = filepath
+        # Day the logged history belongs to, a log from another day is discarded
+        self.date = date
+        # Compact once records exceed 'compact_factor' times the live entries (at least 'compact_min')
+        self.compact_factor = compact_factor
+        self.compact_min = compact_min
+        self.records = 0
+        # Stacks attached before the log was replayed (history loaded lazily), compaction waits until it is
+        self.deferred = False
+        self._stacks = {}
+        self._file = None
+        # Writer thread owning the log file, None writes inline; records are encoded by the caller, so the
+        # logged action is the one pushed & compaction snapshots the stacks as they are
+        self.writer = writer
+        # Write, compaction & fsync counters
+        self.metrics = Metrics()
+
+    # Day the log belongs to from its first record, without replaying it
+    def peek_date(self) -> Optional[str]:
+        if not path.exists(self.filepath):
+            return None
+        with open(self.filepath, "rb") as file:
+            record = decode_record(file.readline())
+        if record is None or record["op"] != "date":
+            return None
+        return record["date"]
+
+    # Rebuild stack contents, oldest first, in time linear in the log
+    def replay(self) -> Dict[str, List[dict]]:
+        stacks = {"undo": [], "redo": []}
+        if not path.exists(self.filepath):
+            return stacks
+
+        date = None
+        offset = 0
+        records = 0
+        with open(self.filepath, "rb") as file:
+            for line in file:
+                record = decode_record(line)
+                if record is None:
+                    # Torn or corrupt record, drop it & everything after it
+                    warning(f"Dropping torn history record at byte {offset} of {self.filepath}")
+                    break
+                offset += len(line)
+                records += 1
+
+                operation = record["op"]
+                if operation == "date":
+                    date = record["date"]
+                elif operation == "push":
+                    stacks[record["stack"]].append(record["action"])
+                elif operation == "pop" and stacks[record["stack"]]:
+                    stacks[record["stack"]].pop()
+                elif operation == "clear":
+                    stacks[record["stack"]].clear()
+
+        # Cut the torn tail so new records follow the last good one
+        if offset < path.getsize(self.filepath):
+            with open(self.filepath, "r+b") as file:
+                file.truncate(offset)
+
+        if date != self.date:
+            debug(f"History log is from {date}, starting a new history for {self.date}")
+            self.records = 0
+            return {"undo": [], "redo": []}
+
+        self.records = records
+        debug(f"Replayed {records} history records from {self.filepath}")
+        return stacks
+
+    # Start logging 'stacks', rewriting the log when it is missing or from another day
+    def attach(self, *stacks: "HistoryStack") -> None:
+        for stack in stacks:
+            self._stacks[stack.name] = stack
+            stack.log = self
+        if self.records == 0:
+            self.compact()
+
+    # Log pushes & pops of 'stacks' on top of today's unreplayed log, replayed once the history is needed
+    def attach_deferred(self, *stacks: "HistoryStack") -> None:
+        self.deferred = True
+        for stack in stacks:
+            self._stacks[stack.name] = stack
+            stack.log = self
+
+    def push(self, stack: str, action: dict) -> None:
+        self._write({"op": "push", "stack": stack, "action": action})
+
+    def pop(self, stack: str) -> None:
+        self._write({"op": "pop", "stack": stack})
+
+    def clear(self, stack: str) -> None:
+        self._write({"op": "clear", "stack": stack})
+
+    # Append one record, compacting once the log outgrows the live history
+    def _write(self, record: dict) -> None:
+        submit_io(self, self._append, encode_record(record))
+        self.records += 1
+        self.metrics.incr("writes")
+
+        # Live counts are unknown until the deferred log is replayed
+        if self.deferred:
+            return
+        live = sum(len(stack) for stack in self._stacks.values())
+        if self.records > max(self.compact_min, self.compact_factor * live):
+            self.compact()
+
+    # Rewrite log as the date plus one push per live entry, atomically
+    def compact(self) -> None:
+        records = [{"op": "date", "date": self.date}]
+        for name, stack in self._stacks.items():
+            records.extend({"op": "push", "stack": name, "action": action} for action in stack.to_list())
+        submit_io(self, self._rewrite, b"".join(encode_record(record) for record in records))
+        self.records = len(records)
+        self.metrics.incr("compactions")
+        debug(f"Compacted history log to {self.records} records")
+
+    # fsync logged records, the only work left at shutdown
+    def sync(self) -> None:
+        submit_io(self, self._sync)
+
+    # Close the log file, the next record reopens it; wait for the writer before reading the log
+    def close(self) -> None:
+        submit_io(self, self._close)
+
+    # Append encoded records, runs on the writer thread
+    def _append(self, data: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.filepath, "ab")
+        self._file.write(data)
+        self._file.flush()
+
+    # Replace the log with encoded records, runs on the writer thread
+    def _rewrite(self, data: bytes) -> None:
+        self._close()
+        temporary = f"{self.filepath}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+            file.flush()
+            fsync(file.fileno())
+        replace(temporary, self.filepath)
+
+    def _sync(self) -> None:
+        if self._file is not None:
+            fsync(self._file.fileno())
+            self.metrics.incr("fsyncs")
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
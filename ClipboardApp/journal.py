@@ -0,0 +1,343 @@
+from functools import partial
+from json import dumps, loads
+from logging import info, debug, warning
+from os import fsync, path
+from threading import Lock
+from time import monotonic, time
+from typing import Callable, List, Optional, Tuple
+from zlib import crc32
+from document import ApprovalsDocument, file_signature
+from writer import submit_io, io_busy, io_barrier
+from persist import retry_locked, is_locked_error
+
+
+# Journal file kept next to a daily approvals file
+def journal_path(filepath: str) -> str:
+    root, _ = path.splitext(filepath)
+    return f"{root}.journal"
+
+
+# Encode 'record' as '<crc32> <json>\n'
+def encode_record(record: dict) -> bytes:
+    payload = dumps(record, separators=(",", ":")).encode("ascii")
+    return b"%08x %s\n" % (crc32(payload), payload)
+
+
+# Decode one '<crc32> <json>\n' line, None if torn or corrupt
+def decode_record(line: bytes) -> Optional[dict]:
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != crc32(payload):
+            return None
+        return loads(payload)
+    except ValueError:
+        return None
+
+
+# Append-only write-ahead journal of approvals file changes, one checksummed JSON record per line
+class Journal:
+    def __init__(self, filepath: str, batch_size: int = 32, fsync_interval: float = 1.0) -> None:
+        self.filepath = filepath
+        # fsync after this many records or this many seconds, whichever comes first
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self._pending = 0
+        self._last_sync = monotonic()
+        self._file = None
+        self._lock = Lock()
+        # Records appended since the approvals file was last written, re-applied if it's edited outside the app
+        self.unmaterialized = []
+
+    # Rebuild document from the journal in time linear in its records
+    # Returns the document (None without a journal) & signature of the last materialized file
+    def replay(self) -> Tuple[Optional[ApprovalsDocument], Optional[tuple]]:
+        if not path.exists(self.filepath):
+            return None, None
+
+        document = None
+        signature = None
+        unmaterialized = []
+        offset = 0
+        records = 0
+        with open(self.filepath, "rb") as file:
+            for line in file:
+                record = decode_record(line)
+                if record is None:
+                    # Torn or corrupt record, drop it & everything after it
+                    warning(f"Dropping torn journal record at byte {offset} of {self.filepath}")
+                    break
+                offset += len(line)
+                records += 1
+
+                operation = record["op"]
+                if operation == "snapshot":
+                    document = ApprovalsDocument.parse(record["lines"])
+                elif operation == "add":
+                    document = document or ApprovalsDocument()
+                    document.insert(record["section"], record["text"])
+                elif operation == "remove" and document is not None:
+                    document.remove(record["section"], record["index"])
+                elif operation == "materialized":
+                    signature = tuple(record["signature"])
+                if operation == "materialized":
+                    unmaterialized = []
+                else:
+                    unmaterialized.append(record)
+
+        # Cut the torn tail so new records follow the last good one
+        if offset < path.getsize(self.filepath):
+            with open(self.filepath, "r+b") as file:
+                file.truncate(offset)
+
+        self.unmaterialized = unmaterialized
+        debug(f"Replayed {records} journal records from {self.filepath}")
+        return document, signature
+
+    # Append one record, fsyncing in batches
+    def append(self, record: dict) -> None:
+        self.extend([record])
+
+    # Append several records with a single write
+    def extend(self, records: List[dict]) -> None:
+        timestamp = time()
+        for record in records:
+            record["ts"] = timestamp
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.filepath, "ab")
+            self._file.write(b"".join(encode_record(record) for record in records))
+            self._file.flush()
+            self.unmaterialized.extend(records)
+            self._pending += len(records)
+            if self._pending >= self.batch_size or monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    # Record an entry inserted under 'section'
+    def add(self, section: str, text: str) -> None:
+        self.append({"op": "add", "section": section, "text": text})
+
+    # Record entries inserted under 'section', in insertion order
+    def add_many(self, section: str, texts: List[str]) -> None:
+        self.extend([{"op": "add", "section": section, "text": text} for text in texts])
+
+    # Record entry 'index' holding 'text' removed from 'section'
+    def remove(self, section: str, index: int, text: Optional[str] = None) -> None:
+        self.append({"op": "remove", "section": section, "index": index, "text": text})
+
+    # Record the whole document, used as base & after restores
+    def snapshot(self, lines: List[str]) -> None:
+        self.append({"op": "snapshot", "lines": lines})
+
+    # Record signature of the approvals file written from the journal
+    def materialized(self, signature: tuple) -> None:
+        self.append({"op": "materialized", "signature": list(signature)})
+        with self._lock:
+            self.unmaterialized = []
+
+    # Copies of the records not yet in the approvals file
+    def pending(self) -> List[dict]:
+        with self._lock:
+            return [dict(record) for record in self.unmaterialized]
+
+    # fsync pending records, caller holds the lock
+    def _sync(self) -> None:
+        if self._file is not None and self._pending:
+            fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = monotonic()
+
+    # fsync pending records now
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+
+# Get the document for 'app.filepath', replaying its journal once per file
+def load_document(app) -> ApprovalsDocument:
+    # Absolute path, 'app.filepath' is relative to the working directory
+    filepath = path.abspath(app.filepath)
+
+    if app.document is None or app.document_path != filepath:
+        # Flush the previous day's or directory's file before switching, queued behind its pending writes
+        if app.journal is not None:
+            materialize(app)
+            submit_io(app, app.journal.close)
+            io_barrier(app)
+
+        app.journal = Journal(journal_path(filepath), app.journal_batch_size, app.journal_fsync_interval)
+        app.document, app.document_signature = app.journal.replay()
+        app.document_path = filepath
+
+    # Base journal on the text file when there is no journal yet or the file was edited outside the app;
+    # only checked while the writer is idle, a materialize in flight changes the signature itself.
+    # Changes still waiting for the debounced rewrite aren't in the file, they're re-applied on top of it
+    if not io_busy(app) and path.exists(filepath) and \
+            (app.document is None or file_signature(filepath) != app.document_signature):
+        with open(filepath, "r") as file:
+            lines = file.readlines()
+        pending = app.journal.pending() if app.document is not None else []
+        app.document = reapply_records(ApprovalsDocument.parse(lines), pending)
+        app.document_signature = file_signature(filepath)
+        app.write_tracker.forget(filepath)
+        submit_io(app, rebase_journal, app.journal, lines, app.document_signature, pending)
+        info(f"Journal based on {filepath}, {len(pending)} unsaved changes re-applied")
+        if pending:
+            schedule_materialize(app)
+
+    # Neither journal nor text file yet, start from empty sections
+    if app.document is None:
+        app.document = ApprovalsDocument()
+        submit_io(app, app.journal.snapshot, app.document.lines())
+    return app.document
+
+
+# Check for an in-memory document, journal or approvals file holding 'app.filepath'
+def has_document(app) -> bool:
+    filepath = path.abspath(app.filepath)
+    if app.document is not None and app.document_path == filepath:
+        return True
+    return path.exists(journal_path(filepath)) or path.exists(filepath)
+
+
+# Write the approvals file now when it's missing (first use of the day or deleted outside the app), from the
+# replayed journal or empty sections when there is none; the in-memory document is never replaced, & while an
+# debounced rewrite is already scheduled ('materialize_job') the file is left to it
+def initialize_document(app) -> None:
+    load_document(app)
+    if app.materialize_job is None:
+        materialize(app)
+
+
+# Record 'lines' as the journal base, matching the text file with 'signature', followed by the 'pending' records
+# not yet written to it
+def rebase_journal(journal: Journal, lines: List[str], signature: tuple, pending: List[dict]) -> None:
+    journal.snapshot(lines)
+    journal.materialized(signature)
+    if pending:
+        journal.extend(pending)
+
+
+# Apply journal 'records' onto 'document' parsed from an approvals file edited outside the app, return it;
+# removes find their entry by value, one the edit already removed is skipped
+def reapply_records(document: ApprovalsDocument, records: List[dict]) -> ApprovalsDocument:
+    for record in records:
+        operation = record["op"]
+        if operation == "snapshot":
+            document = ApprovalsDocument.parse(record["lines"])
+        elif operation == "add":
+            document.insert(record["section"], record["text"])
+        elif operation == "remove" and record.get("text") is not None:
+            section = record["section"]
+            try:
+                document.remove(section, document.locate(section, record["index"], record["text"]))
+            except ValueError:
+                warning(f"Skipped re-applying removal of {record['text']}, it's no longer in the file")
+    return document
+
+
+# Insert 'text' under 'section', journal it & schedule the text file rewrite, return its index
+def record_insert(app, section: str, text: str) -> int:
+    index = load_document(app).insert(section, text)
+    submit_io(app, app.journal.add, section, text)
+    schedule_materialize(app)
+    return index
+
+
+# Insert 'texts' under 'section' with one journal write & one scheduled text file rewrite, return their indexes
+def record_insert_many(app, section: str, texts: List[str]) -> List[int]:
+    document = load_document(app)
+    indexes = [document.insert(section, text) for text in texts]
+    submit_io(app, app.journal.add_many, section, texts)
+    schedule_materialize(app)
+    return indexes
+
+
+# Remove entry 'index' holding 'text' from 'section', journal it & schedule the text file rewrite
+def record_remove(app, section: str, index: int, text: Optional[str] = None) -> str:
+    document = load_document(app)
+    if text is not None:
+        index = document.locate(section, index, text)
+    text = document.remove(section, index)
+    submit_io(app, app.journal.remove, section, index, text)
+    schedule_materialize(app)
+    return text
+
+
+# Replace the whole document with 'lines', journal it & schedule the text file rewrite
+def record_snapshot(app, lines: List[str]) -> None:
+    load_document(app)
+    app.document = ApprovalsDocument.parse(lines)
+    submit_io(app, app.journal.snapshot, app.document.lines())
+    schedule_materialize(app)
+
+
+# Debounce text file rewrites so a burst of appends costs one write
+def schedule_materialize(app) -> None:
+    if app.materialize_job is not None:
+        app.root.after_cancel(app.materialize_job)
+    app.materialize_job = app.root.after(app.materialize_delay, materialize, app)
+
+
+# Regenerate the human-readable approvals file from the in-memory document, the write runs on the writer thread;
+# 'on_done' gets whether it was written, on the Tk thread once the write finished
+def materialize(app, on_done: Optional[Callable[[bool], None]] = None) -> None:
+    # Cancel pending debounce, this call covers it
+    if app.materialize_job is not None:
+        app.root.after_cancel(app.materialize_job)
+        app.materialize_job = None
+    if app.document is None or app.document_path is None:
+        if on_done is not None:
+            on_done(True)
+        return
+
+    # Serialize on the Tk thread so the writer gets a consistent copy
+    submit_io(app, write_document, app, app.journal, app.document_path, app.document.serialize(),
+              on_done=partial(retry_materialize, app, on_done))
+
+
+# Write materialized 'content' to 'filepath' & journal its signature, runs on the writer thread;
+# returns False when an editor still holds the file after the retries
+def write_document(app, journal: Journal, filepath: str, content: str) -> bool:
+    # Skip the rewrite when the file is as last materialized & already holds these bytes
+    if path.exists(filepath) and file_signature(filepath) == app.document_signature \
+            and not app.write_tracker.is_dirty(filepath, content):
+        return True
+
+    # Write right away, backing off only while an editor holds the file
+    try:
+        retry_locked(lambda: write_text(filepath, content), app.write_tracker.metrics)
+    except OSError as e:
+        if not is_locked_error(e):
+            raise
+        warning(f"{filepath} is still locked, its entries stay in the journal until it can be written")
+        return False
+    app.write_tracker.mark_clean(filepath, content)
+    app.document_signature = file_signature(filepath)
+    journal.materialized(app.document_signature)
+    journal.sync()
+    debug(f"Materialized {filepath}")
+    return True
+
+
+# Approvals file still held by another program: rewrite it on the next debounce & tell the user
+def retry_materialize(app, on_done: Optional[Callable[[bool], None]], written: bool) -> None:
+    if not written:
+        schedule_materialize(app)
+        app.emit("status", "Approvals file is open in another program, it's updated once closed")
+    if on_done is not None:
+        on_done(written)
+
+
+# Replace 'filepath' content with 'content'
+def write_text(filepath: str, content: str) -> None:
+    with open(filepath, "w") as file:
+        file.write(content)
@@ -1,33 +1,33 @@
-from os import path, getcwd, chdir
+from functools import partial
+from os import path
 from sys import exit
-from logging import info, basicConfig, DEBUG, INFO, debug
-from datetime import datetime
-from tkinter import messagebox
-from gui import setup_gui, set_window_size, adjust_topmost, check_time_and_close, working_directory_msg
+from logging import info, basicConfig, DEBUG, error
+from platform import system
+from tkinter import Tk
+from gui import setup_gui, adjust_topmost, check_time_and_close, working_directory_msg
 from styles import style_gui
-from ttkthemes import ThemedTk
-from typing import Union, Tuple, List, Optional, Any, Dict
-from states import (
-    start_listening, stop_listening, undo_last_action,
-    redo_last_action, restore_application_state, save_current_state,
-    update_button_states, save_application_state, load_application_state,
-    save_stack_states, load_stack_states, get_app_data_dir,
-    set_working_directory
-)
-from clipboard import check_clipboard, process_master_id
+from typing import List, Optional
+from states import start_listening, stop_listening, update_button_states, set_working_directory
+from clipboard import check_clipboard, queue_master_id
+from uiqueue import UiQueue, StallMonitor
+from monitors import MonitorCache, TopmostController
+from writer import FileWriter
+from filters import IdFilter
+from engine import Engine
+from store import get_app_data_dir, load_config, DataDirectoryLocked
 from append import (
     append_new_master_id, append_split_candidate,
-    append_merge_candidate, append_to_file, append_note,
-    append_duplicate_entry
+    append_merge_candidate, append_note, append_duplicate_entry
 )
 from update import (
-    update_text_display, update_counter_label, set_master_id, open_file, update_directory_label
+    update_text_display, update_counter_label, set_master_id, open_file, update_directory_label,
+    update_duplicate_button, show_write_error, show_status
 )
 
 
 # noinspection PyAttributeOutsideInit,PyShadowingNames
 class App:
-    def __init__(self, root: ThemedTk) -> None:
+    def __init__(self, root: Tk) -> None:
         info("Constructor instantiated")
         # Root window for the GUI
         self.root = root
@@ -39,45 +39,70 @@ class App:
         # Set title of root window
         self.root.title("Data Steward Clipboard Manager")
 
+        # Monitor geometry, cached between screen changes, & topmost decisions made once a move settles
+        self.monitor_cache = MonitorCache(self.root)
+        self.topmost = TopmostController(self.root, self.monitor_cache)
+
         # Set bridge between constructor & Tkinter eventloop to adjust_topmost
-        self.root.bind('<Configure>', lambda e: adjust_topmost(self))
+        self.root.bind('<Configure>', lambda e: adjust_topmost(self, e))
+
+        # ttk theme, applied by 'style_gui'
+        self.theme = "vista"
 
         # Flag to control loop in the separate thread
         self.running = False
+        # Clipboard watcher backend: 'auto', 'x11', 'poll' or 'fake'
+        self.watcher_backend = "auto"
+        # Active clipboard watcher, chosen when listening starts
+        self.watcher = None
+        # Clipboard reader backend: 'auto', 'x11', 'tk' or 'pyperclip'
+        self.reader_backend = "auto"
+        # Active clipboard reader, chosen when listening starts
+        self.reader = None
+        # Adaptive poll interval bounds (seconds) for the polling backend
+        self.poll_min_interval = 0.02
+        self.poll_max_interval = 0.25
         # Flag to track application close events
         self.closed = 0
-        # Master ID set by user
-        self.master_id = None
         # New master id set by user
         self.new_master_id = None
         # Split candidate set by user
         self.split_candidate = None
         # Merge candidate set by user
         self.merge_candidate = None
-        # Initial working directory
-        self.working_directory = None
         # Keeps track of the previous clipboard content
         self.previous_clipboard = ""
+        # Length & hash of the last clipboard payload read
+        self.clipboard_fingerprint = None
+        # Clipboard payloads longer than this (characters) are skipped
+        self.max_payload_size = 64 * 1024
+        # Filter that keeps non-ID clipboard content (emails, URLs, paragraphs) off the capture path,
+        # its pattern can be changed in 'config.json'
+        self.id_filter = IdFilter.from_config(load_config(get_app_data_dir()))
         # Stores the last event time
         self.last_event_time = 0
         # List to store intervals between copy events
         self.note = None
-        # Set to store unique master IDs
-        self.unique_master_ids = set()
-        # Counter for unique master IDs
-        self.master_id_counter = 0
-        # Variable for duplicate entry
-        self.last_processed_entry = None
-        # Undo functionality stack
-        self.undo_stack = []
-        # Redo functionality stack
-        self.redo_stack = []
-        # Define filepath
-        self.filepath = None
-        # Grab current date & format
-        self.current_date = datetime.now().strftime("%Y.%m.%d")
-        # Create filepath
-        self.filepath = f"{self.current_date}.approvals.txt"
+        # Lines rendered in the ID display, older ones are paged in on scroll
+        self.display_capacity = 500
+        # Window (ms) captured IDs are coalesced over into one file write, 0 appends each ID on its own
+        self.coalesce_window = 50
+        # Captured IDs handed from the clipboard thread to the Tk thread
+        self.ui_queue = UiQueue(self.root, self.process_master_ids, self.coalesce_window, batched=True) \
+            if self.coalesce_window else UiQueue(self.root, self.process_master_id)
+        # Writer thread owning approvals file & journal I/O, its results & failures come back through 'completions',
+        # drained less often while idle
+        self.completions = UiQueue(self.root, lambda callback: callback(), idle_interval=250)
+        self.writer = FileWriter(self.completions, lambda e: show_write_error(self, e))
+        # UI-free core: approvals document, undo/redo, counter & persistence; this class only adapts it to Tk
+        self.engine = Engine(self.root, get_app_data_dir(), self.writer)
+        # Measures how long the Tk event loop is blocked, off by default: it wakes Tk every 50 ms
+        self.measure_stalls = False
+        self.stall_monitor = StallMonitor(self.root) if self.measure_stalls else None
+        # Time of the last write failure shown to the user
+        self.last_write_error = float("-inf")
+        # Pending 'after' job clearing the status bar message
+        self.status_job = None
 
         # Open the application
         self.open_app()
@@ -93,13 +118,10 @@ class App:
         stop_listening(self)
 
     def undo_last_action(self) -> None:
-        undo_last_action(self)
+        self.engine.undo()
 
     def redo_last_action(self) -> None:
-        redo_last_action(self)
-
-    def restore_application_state(self, state: Optional[Tuple[list, list, int, Optional[str], Optional[str], Optional[str]]]) -> None:
-        restore_application_state(self, state)
+        self.engine.redo()
 
     def update_button_states(self) -> None:
         update_button_states(self)
@@ -112,8 +134,18 @@ class App:
     def check_clipboard(self) -> None:
         check_clipboard(self)
 
+    def queue_master_id(self, unique_id: str) -> None:
+        queue_master_id(self, unique_id)
+
+    # Show 'message' in the status bar, safe from the clipboard thread
+    def queue_status(self, message: str) -> None:
+        self.completions.put(partial(show_status, self, message))
+
     def process_master_id(self, unique_id: str) -> None:
-        process_master_id(self, unique_id)
+        self.engine.process_master_ids([unique_id])
+
+    def process_master_ids(self, unique_ids: List[str]) -> None:
+        self.engine.process_master_ids(unique_ids)
 
 
     ## Instance methods for appending entries ##
@@ -126,8 +158,8 @@ class App:
     def append_merge_candidate(self) -> None:
         append_merge_candidate(self)
 
-    def append_to_file(self, text: str, section: str) -> None:
-        append_to_file(self, text, section)
+    def append_to_file(self, text: str, section: str) -> Optional[dict]:
+        return self.engine.append_entry(text, section)
 
     def append_duplicate_entry(self) -> None:
         append_duplicate_entry(self)
@@ -149,21 +181,40 @@ class App:
     def set_master_id(self) -> None:
         set_master_id(self)
 
+    def open_file(self) -> None:
+        open_file(self)
+
+
+    ## Instance method for connecting the widgets to engine events ##
+    def connect_engine(self) -> None:
+        self.engine.on("appended", self.display.append)
+        self.engine.on("removed", self.display.remove_entry)
+        self.engine.on("reset", self.display.reset)
+        self.engine.on("counter", lambda count: self.update_counter_label())
+        self.engine.on("last_entry", lambda entry: update_duplicate_button(self, entry))
+        self.engine.on("history", self.update_button_states)
+        self.engine.on("directory", lambda directory: self.update_directory_label())
+        self.engine.on("duplicate", lambda text, filename: self.display.flag(text))
+        self.engine.on("status", lambda message: show_status(self, message))
+
 
     ## Instance method for opening app ##
     def open_app(self) -> None:
 
-        # Set up the GUI
+        # Set up the GUI & follow engine changes in it
         setup_gui(self)
+        self.connect_engine()
 
-        # Load the application state
-        load_application_state(self)
+        # Load application 'state' & stack 'states', then autosave in the background from here on
+        self.engine.open()
 
         # Instantiate GUI style
         style_gui(self)
 
-        # Load stack 'states'
-        load_stack_states(self)
+        # Drain writer completions on the Tk thread, captured IDs are drained while listening
+        self.completions.start()
+        if self.stall_monitor is not None:
+            self.stall_monitor.start()
 
         # Delay working directory msg for 5 secs
         self.root.after(1500, working_directory_msg, self)
@@ -172,34 +223,54 @@ class App:
 
     ## Instance method for closing app ##
     def close_app(self) -> None:
-        if path.isfile(self.filepath):
-            debug(f"App closing, file exists, self.filepath: {self.filepath}")
-            save_application_state(self)
-            save_stack_states(self)
-        else:
-            debug("App closing, file does not exist")
-
+        # Stop capturing & append IDs the clipboard thread already queued
         self.running = False
+        self.ui_queue.stop()
+        info(f"UI queue stats: {self.ui_queue.metrics.snapshot()}")
+
+        # Save final 'state' & history & write the approvals file, then stop the writer
+        self.engine.close()
+        self.writer.stop()
+        self.completions.stop()
+        info(f"File writer stats: {self.writer.metrics.snapshot()}")
+        if self.stall_monitor is not None:
+            self.stall_monitor.stop()
+            info(f"UI stall stats: {self.stall_monitor.metrics.snapshot()}")
+        self.topmost.stop()
+        info(f"Topmost stats: {self.topmost.stats()}")
+
+        if self.watcher is not None:
+            self.watcher.stop()
         self.root.quit()
         self.root.destroy()
 
 
 # Main function for application entry into Tkinter 'event-loop'
 def main() -> None:
+    # Fail early on an OS without an app data directory
     try:
-        app_data_dir = get_app_data_dir()
+        get_app_data_dir()
     except RuntimeError as e:
         # Handle unsupported OS error
         error(f"Application cannot run: {e}")
+        from tkinter import messagebox
         messagebox.showerror("Unsupported OS", f"Your operating system is not supported: {system()}")
         # Exit application gracefully
         exit(1)
 
-    # Create main window with stated theme
-    root = ThemedTk(theme="vista")
+    # Create main window, the theme is applied once the widgets exist
+    root = Tk()
 
-    # Create app
-    app = App(root=root)
+    # Create app, one per app data directory
+    try:
+        app = App(root=root)
+    except DataDirectoryLocked as e:
+        error(f"Application cannot run: {e}")
+        from tkinter import messagebox
+        messagebox.showerror("Already running", "The Clipboard Manager is already open or a batch import is running. "
+                                                "Close it & start again.")
+        root.destroy()
+        exit(1)
 
     # Check time & close app if 5:30pm
     check_time_and_close(root, 13, 42)
@@ -0,0 +1,184 @@
+from logging import debug, warning
+from os import fsync, makedirs, path, replace
+from threading import RLock
+from typing import Dict, Iterable, Iterator, Optional, Set
+from journal import encode_record, decode_record
+from metrics import Metrics
+from writer import FileWriter, submit_io
+
+
+# Master IDs counted per day, kept across restarts in an append-only log of checksummed records:
+# a set-like view of 'date' for the unique master ID counter plus O(1) lookups of any earlier day;
+# the log is read on first use & every add/discard appends one record
+class MasterIndex:
+    def __init__(self, filepath: str, date: str, compact_factor: int = 2, compact_min: int = 1000,
+                 writer: Optional[FileWriter] = None) -> None:
+        self.filepath = filepath
+        # Day the set-like view & new records belong to
+        self.date = date
+        # Compact once records exceed 'compact_factor' times the live entries (at least 'compact_min')
+        self.compact_factor = compact_factor
+        self.compact_min = compact_min
+        # Master IDs per day, & for each master ID how many days it was counted on
+        self._days: Optional[Dict[str, Set[str]]] = None
+        self._seen: Dict[str, int] = {}
+        self._records = 0
+        self._file = None
+        self._lock = RLock()
+        # Writer thread owning the log file, None writes inline; the log is read before anything is written
+        self.writer = writer
+        # Loads, lookups & records written
+        self.metrics = Metrics()
+
+    # Today's master IDs, loading the log on first use
+    @property
+    def today(self) -> Set[str]:
+        return self._load().setdefault(self.date, set())
+
+    def __contains__(self, master_id: str) -> bool:
+        self.metrics.incr("lookups")
+        return master_id in self.today
+
+    def __len__(self) -> int:
+        return len(self.today)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.today)
+
+    # Count 'master_id' for today
+    def add(self, master_id: str) -> None:
+        with self._lock:
+            if master_id in self.today:
+                return
+            self.today.add(master_id)
+            self._seen[master_id] = self._seen.get(master_id, 0) + 1
+            self._write({"op": "add", "date": self.date, "id": master_id})
+
+    # Uncount 'master_id' for today, e.g. when its first approval is undone
+    def discard(self, master_id: str) -> None:
+        with self._lock:
+            if master_id not in self.today:
+                return
+            self.today.discard(master_id)
+            self._forget(master_id)
+            self._write({"op": "remove", "date": self.date, "id": master_id})
+
+    # Count every master in 'master_ids' for today not counted yet, with one write
+    def update(self, master_ids: Iterable[str]) -> None:
+        with self._lock:
+            new = [master_id for master_id in dict.fromkeys(master_ids) if master_id not in self.today]
+            for master_id in new:
+                self.today.add(master_id)
+                self._seen[master_id] = self._seen.get(master_id, 0) + 1
+            if new:
+                self._write_many([{"op": "add", "date": self.date, "id": master_id} for master_id in new])
+
+    # Check if 'master_id' was counted on a day before today
+    def seen_before(self, master_id: str) -> bool:
+        self._load()
+        self.metrics.incr("lookups")
+        return self._seen.get(master_id, 0) > (master_id in self.today)
+
+    # Days 'master_id' was counted on, oldest first
+    def days(self, master_id: str) -> list:
+        return sorted(date for date, masters in self._load().items() if master_id in masters)
+
+    # Read the log once, in time linear in its records
+    def _load(self) -> Dict[str, Set[str]]:
+        if self._days is not None:
+            return self._days
+        with self._lock:
+            if self._days is not None:
+                return self._days
+            days = {}
+            offset = 0
+            if path.exists(self.filepath):
+                with open(self.filepath, "rb") as file:
+                    for line in file:
+                        record = decode_record(line)
+                        if record is None:
+                            # Torn or corrupt record, drop it & everything after it
+                            warning(f"Dropping torn master ID record at byte {offset} of {self.filepath}")
+                            break
+                        offset += len(line)
+                        self._records += 1
+                        if record["op"] == "add":
+                            days.setdefault(record["date"], set()).add(record["id"])
+                        elif record["op"] == "remove":
+                            days.get(record["date"], set()).discard(record["id"])
+
+                # Cut the torn tail so new records follow the last good one
+                if offset < path.getsize(self.filepath):
+                    with open(self.filepath, "r+b") as file:
+                        file.truncate(offset)
+
+            for masters in days.values():
+                for master_id in masters:
+                    self._seen[master_id] = self._seen.get(master_id, 0) + 1
+            self._days = days
+            self.metrics.incr("loads")
+            debug(f"Loaded {self._records} master ID records for {len(days)} days from {self.filepath}")
+
+            if self._records > max(self.compact_min, self.compact_factor * self._live()):
+                self.compact()
+            return self._days
+
+    def _live(self) -> int:
+        return sum(len(masters) for masters in self._days.values())
+
+    def _forget(self, master_id: str) -> None:
+        if self._seen.get(master_id, 0) <= 1:
+            self._seen.pop(master_id, None)
+        else:
+            self._seen[master_id] -= 1
+
+    def _write(self, record: dict) -> None:
+        self._write_many([record])
+
+    # Append 'records' with a single write, compacting once the log outgrows the live entries
+    def _write_many(self, records: list) -> None:
+        with self._lock:
+            submit_io(self, self._append, b"".join(encode_record(record) for record in records))
+            self._records += len(records)
+            self.metrics.incr("writes", len(records))
+            if self._records > max(self.compact_min, self.compact_factor * self._live()):
+                self.compact()
+
+    # Rewrite the log as one add per counted master ID & day, atomically
+    def compact(self) -> None:
+        with self._lock:
+            records = [
+                {"op": "add", "date": date, "id": master_id}
+                for date, masters in sorted(self._days.items()) for master_id in sorted(masters)
+            ]
+            submit_io(self, self._rewrite, b"".join(encode_record(record) for record in records))
+            self._records = len(records)
+            self.metrics.incr("compactions")
+        debug(f"Compacted master ID index to {self._records} records")
+
+    def close(self) -> None:
+        submit_io(self, self._close)
+
+    # Append encoded records, runs on the writer thread
+    def _append(self, data: bytes) -> None:
+        if self._file is None:
+            makedirs(path.dirname(self.filepath) or ".", exist_ok=True)
+            self._file = open(self.filepath, "ab")
+        self._file.write(data)
+        self._file.flush()
+
+    # Replace the log with encoded records, runs on the writer thread
+    def _rewrite(self, data: bytes) -> None:
+        self._close()
+        temporary = f"{self.filepath}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+            file.flush()
+            fsync(file.fileno())
+        replace(temporary, self.filepath)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
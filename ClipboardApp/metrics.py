@@ -0,0 +1,47 @@
+from threading import Lock
+from typing import Dict
+
+
+# Thread-safe counters & latency observations shared by the capture pipeline
+class Metrics:
+    def __init__(self) -> None:
+        # Guard counters that are touched from worker threads & the Tk thread
+        self._lock = Lock()
+        # Plain event counters
+        self._counts: Dict[str, int] = {}
+        # Observed values as [count, total, max]
+        self._observations: Dict[str, list] = {}
+
+    # Increment counter 'name' by 'amount'
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    # Record a single observed value (latency, size, depth, ...)
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            observation = self._observations.setdefault(name, [0, 0.0, 0.0])
+            observation[0] += 1
+            observation[1] += value
+            observation[2] = max(observation[2], value)
+
+    # Read counter 'name'
+    def count(self, name: str) -> int:
+        with self._lock:
+            return self._counts.get(name, 0)
+
+    # Copy of all counters & observation summaries
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._counts)
+            for name, (count, total, maximum) in self._observations.items():
+                snapshot[f"{name}.count"] = count
+                snapshot[f"{name}.avg"] = total / count if count else 0.0
+                snapshot[f"{name}.max"] = maximum
+            return snapshot
+
+    # Reset all counters & observations
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._observations.clear()
@@ -0,0 +1,127 @@
+from logging import debug
+from time import monotonic
+from typing import Callable, List, Optional
+from metrics import Metrics
+
+
+# Enumerate monitors, an xrandr / EnumDisplayMonitors round trip; 'screeninfo' is only imported when first needed
+def query_monitors() -> list:
+    from screeninfo import get_monitors
+    return get_monitors()
+
+
+# Monitor geometry cached between screen changes, refreshed when Tk reports a new screen size,
+# when the window sits on no known monitor (one was added or moved) or after 'ttl' seconds
+class MonitorCache:
+    def __init__(self, root, query: Callable[[], list] = query_monitors, ttl: float = 300.0) -> None:
+        self.root = root
+        self.query = query
+        self.ttl = ttl
+        self._monitors: Optional[list] = None
+        self._screen = None
+        self._expires = 0.0
+        # Monitor queries, cache hits & why the cache was refreshed
+        self.metrics = Metrics()
+
+    # Screen size as Tk sees it, updated by the window manager when monitors change
+    def _screen_size(self) -> tuple:
+        return self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+
+    # Drop cached geometry, the next lookup queries the monitors again
+    def invalidate(self) -> None:
+        self._monitors = None
+
+    def refresh(self) -> list:
+        self._monitors = list(self.query())
+        self._screen = self._screen_size()
+        self._expires = monotonic() + self.ttl
+        self.metrics.incr("queries")
+        debug(f"Monitor topology: {[(m.x, m.y, m.width, m.height) for m in self._monitors]}")
+        return self._monitors
+
+    # Cached monitors, queried again only when stale
+    def monitors(self) -> List:
+        if self._monitors is None:
+            return self.refresh()
+        if self._screen_size() != self._screen:
+            self.metrics.incr("screen_changes")
+            return self.refresh()
+        if monotonic() >= self._expires:
+            self.metrics.incr("expired")
+            return self.refresh()
+        self.metrics.incr("hits")
+        return self._monitors
+
+    # Index of the monitor whose horizontal span holds 'x', re-querying once if none does
+    def monitor_index(self, x: int) -> Optional[int]:
+        index = self._find(self.monitors(), x)
+        if index is None:
+            self.metrics.incr("misses")
+            index = self._find(self.refresh(), x)
+        return index
+
+    @staticmethod
+    def _find(monitors: list, x: int) -> Optional[int]:
+        found = None
+        for index, monitor in enumerate(monitors):
+            # Check if top left-most corner of GUI falls between left & right edge of monitor,
+            # on a shared edge the later monitor wins
+            if monitor.x <= x <= monitor.x + monitor.width:
+                found = index
+        return found
+
+
+# Keeps the window topmost on secondary monitors, deciding once per settled move instead of on every
+# '<Configure>' event: child-widget resizes are ignored & a drag's events collapse into one decision
+class TopmostController:
+    def __init__(self, root, cache: MonitorCache, delay: int = 150) -> None:
+        self.root = root
+        self.cache = cache
+        # Quiet period (ms) after the last move before deciding
+        self.delay = delay
+        self._job = None
+        # Window position & topmost flag of the last decision
+        self._position = None
+        self._topmost = None
+        # Configure events, moves, decisions & attribute changes; monitor queries are in 'cache.metrics'
+        self.metrics = Metrics()
+
+    # '<Configure>' handler, bound on the root so it also sees every child widget's events
+    def on_configure(self, event=None) -> None:
+        self.metrics.incr("configure_events")
+        if event is not None and event.widget is not self.root:
+            return
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self.metrics.incr("debounced")
+        self._job = self.root.after(self.delay, self.adjust)
+
+    # Decide if app is the topmost application depending on monitor
+    def adjust(self) -> None:
+        self._job = None
+        position = self.root.winfo_x()
+        if position == self._position:
+            return
+        self._position = position
+        self.metrics.incr("decisions")
+
+        index = self.cache.monitor_index(position)
+        if index is None:
+            return
+        # If it's on the second monitor (index > 0), always keep GUI on top, on the first (primary) don't
+        topmost = index > 0
+        if topmost != self._topmost:
+            self.root.attributes('-topmost', topmost)
+            self._topmost = topmost
+            self.metrics.incr("changes")
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    # Configure & monitor query counters together
+    def stats(self) -> dict:
+        stats = self.metrics.snapshot()
+        stats.update({f"monitors.{key}": value for key, value in self.cache.metrics.snapshot().items()})
+        return stats
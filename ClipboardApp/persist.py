@@ -0,0 +1,105 @@
+from errno import EACCES, EBUSY
+from hashlib import blake2b
+from logging import debug, warning
+from os import fsync, path, replace
+from threading import Lock
+from time import sleep
+from typing import Callable, Optional, TypeVar
+from metrics import Metrics
+
+
+T = TypeVar("T")
+
+# Windows ERROR_SHARING_VIOLATION & ERROR_LOCK_VIOLATION, raised while another program holds the file
+LOCKED_WINERRORS = (32, 33)
+
+
+# Check if 'e' means the file is temporarily held by another process rather than really unwritable
+def is_locked_error(e: OSError) -> bool:
+    return isinstance(e, PermissionError) or getattr(e, "winerror", None) in LOCKED_WINERRORS or \
+        e.errno in (EACCES, EBUSY)
+
+
+# Run 'operation' right away, retrying with bounded exponential backoff while the file is locked or busy
+def retry_locked(operation: Callable[[], T], metrics: Optional[Metrics] = None, attempts: int = 6,
+                 base_delay: float = 0.01, max_delay: float = 0.5) -> T:
+    metrics = metrics or Metrics()
+    delay = base_delay
+    for attempt in range(attempts):
+        try:
+            result = operation()
+            if attempt:
+                metrics.incr("retry_successes")
+            return result
+        except OSError as e:
+            if not is_locked_error(e) or attempt == attempts - 1:
+                if attempt:
+                    metrics.incr("retry_exhausted")
+                raise
+            metrics.incr("retries")
+            metrics.observe("retry_delay_ms", delay * 1000)
+            warning(f"File locked, retrying in {delay * 1000:.0f} ms: {e}")
+            sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+# Write 'data' to 'filepath' atomically: temp file, fsync, then rename over the original
+def atomic_write(filepath: str, data: str) -> None:
+    temporary = f"{filepath}.tmp"
+    with open(temporary, "w") as file:
+        file.write(data)
+        file.flush()
+        fsync(file.fileno())
+    replace(temporary, filepath)
+
+
+# Digest of file content, compared instead of the content itself
+def content_hash(data: str) -> bytes:
+    return blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+
+# Dirty tracking for persisted artifacts: remembers the content hash last written to (or found at) each path
+# so a write whose bytes are unchanged is skipped
+class WriteTracker:
+    def __init__(self) -> None:
+        self._hashes = {}
+        # Autosave writes from its worker thread, everything else from the Tk thread
+        self._lock = Lock()
+        # Performed & skipped writes, in total & per file name, & retries on locked files
+        self.metrics = Metrics()
+
+    # Check if 'data' differs from what 'filepath' holds, counting a skipped write if it doesn't
+    def is_dirty(self, filepath: str, data: str) -> bool:
+        digest = content_hash(data)
+        with self._lock:
+            known = self._hashes.get(filepath)
+            if known is None and path.exists(filepath):
+                # First write to this path this session, hash what is on disk once
+                with open(filepath, "r") as file:
+                    known = self._hashes[filepath] = content_hash(file.read())
+        if known != digest:
+            return True
+        self.metrics.incr("skipped")
+        self.metrics.incr(f"skipped.{path.basename(filepath)}")
+        debug(f"Skipped write of unchanged {filepath}")
+        return False
+
+    # Record 'data' as written to 'filepath'
+    def mark_clean(self, filepath: str, data: str) -> None:
+        with self._lock:
+            self._hashes[filepath] = content_hash(data)
+        self.metrics.incr("written")
+        self.metrics.incr(f"written.{path.basename(filepath)}")
+
+    # Forget the hash of 'filepath', e.g. after it was edited outside the app
+    def forget(self, filepath: str) -> None:
+        with self._lock:
+            self._hashes.pop(filepath, None)
+
+    # Atomically write 'data' to 'filepath' unless it already holds it, return if a write was issued
+    def write(self, filepath: str, data: str) -> bool:
+        if not self.is_dirty(filepath, data):
+            return False
+        retry_locked(lambda: atomic_write(filepath, data), self.metrics)
+        self.mark_clean(filepath, data)
+        return True
@@ -0,0 +1,220 @@
+from ctypes import POINTER, byref, c_int, c_ubyte, c_ulong, string_at
+from importlib.util import find_spec
+from logging import info, debug, warning
+from platform import system
+from select import select
+from threading import Event, Lock, current_thread, main_thread
+from time import monotonic
+from tkinter import TclError
+from x11 import (
+    load_xlib, new_event, x11_available, XSelectionEvent, ANY_PROPERTY_TYPE, CURRENT_TIME, SELECTION_NOTIFY
+)
+
+
+# Common interface for clipboard readers shared by the watcher backends & 'start_listening'
+class ClipboardReader:
+    name = "base"
+
+    # Check if reader can run on this machine
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    # Read current clipboard text ('' when empty or not text)
+    def read(self) -> str:
+        raise NotImplementedError
+
+    # Empty clipboard, called from the Tk thread
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    # Release reader resources, called from the thread that reads
+    def close(self) -> None:
+        pass
+
+
+# 'pyperclip' reader, forks 'xclip'/'xsel' for every read on Linux
+class PyperclipReader(ClipboardReader):
+    name = "pyperclip"
+
+    # Check the package is installed without importing it
+    @classmethod
+    def available(cls) -> bool:
+        return find_spec("pyperclip") is not None
+
+    def read(self) -> str:
+        from pyperclip import paste
+        return paste()
+
+    def clear(self) -> None:
+        from pyperclip import copy
+        copy("")
+
+
+# In-process reader using Tk's own 'clipboard_get'; worker threads never call Tk, they queue the read on
+# 'requests' (a 'UiQueue' running callbacks on the Tk thread) & wait for its answer
+class TkReader(ClipboardReader):
+    name = "tk"
+
+    def __init__(self, root, requests=None, timeout: float = 1.0) -> None:
+        self.root = root
+        self.requests = requests
+        # Longest time a worker waits for the main loop to answer
+        self.timeout = timeout
+
+    # Read directly on the Tk thread
+    def _get(self) -> str:
+        try:
+            return self.root.clipboard_get()
+        except TclError:
+            # Clipboard empty or not text
+            return ""
+
+    def read(self) -> str:
+        if current_thread() is main_thread():
+            return self._get()
+
+        if self.requests is None:
+            raise RuntimeError("Tk clipboard reads from a worker thread need a UI queue")
+
+        # Ask the main loop to read & wait for its answer
+        done = Event()
+        result = []
+
+        def _answer() -> None:
+            result.append(self._get())
+            done.set()
+
+        self.requests.put(_answer)
+        if not done.wait(self.timeout):
+            raise TimeoutError("Tk main loop did not answer clipboard read")
+        return result[0]
+
+    def clear(self) -> None:
+        self.root.clipboard_clear()
+
+
+# In-process reader that asks the CLIPBOARD owner for UTF8_STRING over its own X connection
+class X11Reader(ClipboardReader):
+    name = "x11"
+
+    def __init__(self, root=None, timeout: float = 1.0) -> None:
+        # Tk root used to clear the clipboard, Tk then owns the empty selection
+        self.root = root
+        # Longest time to wait for the selection owner to answer
+        self.timeout = timeout
+        self._xlib, _ = load_xlib()
+        self._display = None
+        self._lock = Lock()
+
+    @classmethod
+    def available(cls) -> bool:
+        return x11_available()
+
+    # Open display & hidden requestor window on first use, in the reading thread
+    def _open(self) -> None:
+        xlib = self._xlib
+        self._display = xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("Cannot open X display")
+        root = xlib.XDefaultRootWindow(self._display)
+        self._window = xlib.XCreateSimpleWindow(self._display, root, 0, 0, 1, 1, 0, 0, 0)
+        self._clipboard = xlib.XInternAtom(self._display, b"CLIPBOARD", 0)
+        self._utf8 = xlib.XInternAtom(self._display, b"UTF8_STRING", 0)
+        self._incr = xlib.XInternAtom(self._display, b"INCR", 0)
+        self._property = xlib.XInternAtom(self._display, b"CLIPBOARD_MANAGER_READ", 0)
+        self._fd = xlib.XConnectionNumber(self._display)
+
+    # Wait for the owner's 'SelectionNotify', return its property atom (0 when refused)
+    def _wait_for_notify(self) -> int:
+        deadline = monotonic() + self.timeout
+        event = new_event()
+        while True:
+            while self._xlib.XPending(self._display):
+                self._xlib.XNextEvent(self._display, event)
+                notify = XSelectionEvent.from_buffer(event)
+                if notify.type == SELECTION_NOTIFY and notify.selection == self._clipboard:
+                    return notify.property
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Clipboard owner did not answer")
+            select([self._fd], [], [], remaining)
+
+    def read(self) -> str:
+        with self._lock:
+            if self._display is None:
+                self._open()
+            xlib = self._xlib
+
+            # Nobody owns the clipboard
+            if not xlib.XGetSelectionOwner(self._display, self._clipboard):
+                return ""
+
+            # Ask owner to convert CLIPBOARD to UTF8_STRING into our window property
+            xlib.XConvertSelection(
+                self._display, self._clipboard, self._utf8, self._property, self._window, CURRENT_TIME
+            )
+            xlib.XFlush(self._display)
+            if not self._wait_for_notify():
+                return ""
+
+            # Fetch & delete property in one round trip
+            actual_type, actual_format = c_ulong(), c_int()
+            items, remaining = c_ulong(), c_ulong()
+            data = POINTER(c_ubyte)()
+            xlib.XGetWindowProperty(
+                self._display, self._window, self._property, 0, 0x7FFFFFFF, 1, ANY_PROPERTY_TYPE,
+                byref(actual_type), byref(actual_format), byref(items), byref(remaining), byref(data)
+            )
+            try:
+                if actual_type.value == self._incr:
+                    # Large transfers use the INCR protocol, let 'pyperclip' handle those
+                    debug("Clipboard uses INCR transfer, falling back to pyperclip")
+                    return PyperclipReader().read()
+                if not data:
+                    return ""
+                return string_at(data, items.value * actual_format.value // 8).decode("utf-8", "replace")
+            finally:
+                if data:
+                    xlib.XFree(data)
+
+    def clear(self) -> None:
+        self.root.clipboard_clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._display is not None:
+                self._xlib.XDestroyWindow(self._display, self._window)
+                self._xlib.XCloseDisplay(self._display)
+                self._display = None
+
+
+# Readers selectable by name
+READERS = {
+    PyperclipReader.name: PyperclipReader,
+    TkReader.name: TkReader,
+    X11Reader.name: X11Reader,
+}
+
+
+# Pick & construct a clipboard reader for 'backend' ('auto' prefers in-process readers)
+def select_reader(backend: str = "auto", root=None, requests=None) -> ClipboardReader:
+    if backend == PyperclipReader.name:
+        reader = PyperclipReader()
+    elif backend == TkReader.name:
+        reader = TkReader(root, requests)
+    elif backend == X11Reader.name:
+        reader = X11Reader(root)
+    elif X11Reader.available():
+        reader = X11Reader(root)
+    elif system() == "Windows":
+        # 'pyperclip' already reads in-process through the Win32 API on Windows
+        reader = PyperclipReader()
+    elif root is not None:
+        reader = TkReader(root, requests)
+    else:
+        warning("No in-process clipboard reader available, using pyperclip")
+        reader = PyperclipReader()
+
+    info(f"Clipboard reader backend: {reader.name}")
+    return reader
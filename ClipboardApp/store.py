@@ -0,0 +1,124 @@
+from json import load, JSONDecodeError
+from logging import debug, warning
+from os import path, environ, makedirs
+from platform import system
+from typing import Optional
+from history import HistoryLog
+from metrics import Metrics
+
+
+# Check user OS & create JSON files to save application states
+def get_app_data_dir() -> str:
+    app_name = "Data Steward Clipboard Manager"
+    systehm = system()
+
+    # Determine save directory based on OS
+    if systehm == 'Windows':
+        path_to_dir = path.join(environ['LOCALAPPDATA'], app_name)
+        return path_to_dir
+    elif systehm == 'Darwin':
+        return path.join(path.expanduser('~'), 'Library', 'Application Support', app_name)
+    elif systehm == 'Linux':
+        return path.join(path.expanduser('~'), '.config', app_name)
+    else:
+        # Raise error if OS is unsupported
+        raise RuntimeError('Unsupported OS')
+
+
+# User settings in 'config.json' of the app data directory, e.g. the ID filter's 'id_patterns';
+# empty when there is no file or it can't be read, the defaults apply then
+def load_config(app_data_dir: str) -> dict:
+    filepath = path.join(app_data_dir, "config.json")
+    if not path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, "r") as file:
+            config = load(file)
+    except (OSError, IOError, JSONDecodeError) as e:
+        warning(f"Ignoring unreadable config {filepath}: {e}")
+        return {}
+    if not isinstance(config, dict):
+        warning(f"Ignoring config {filepath}, it isn't a JSON object")
+        return {}
+    return config
+
+
+# Raised when another process (the app or a batch CLI run) holds the app data directory
+class DataDirectoryLocked(RuntimeError):
+    pass
+
+
+# Exclusive lock on the app data directory: the saved 'state', history log, spilled history & master ID index
+# are owned by one process at a time, so a second app or batch CLI run is refused instead of deleting or
+# interleaving the first one's files; the OS drops the lock when its process dies
+class DataDirectoryLock:
+    def __init__(self, app_data_dir: str) -> None:
+        self.filepath = path.join(app_data_dir, "lock")
+        self._file = None
+
+    def acquire(self) -> None:
+        makedirs(path.dirname(self.filepath), exist_ok=True)
+        file = open(self.filepath, "a+")
+        try:
+            # Lock modules are platform specific, imported on first use
+            if system() == "Windows":
+                from msvcrt import locking, LK_NBLCK
+                file.seek(0)
+                locking(file.fileno(), LK_NBLCK, 1)
+            else:
+                from fcntl import flock, LOCK_EX, LOCK_NB
+                flock(file.fileno(), LOCK_EX | LOCK_NB)
+        except OSError:
+            file.close()
+            raise DataDirectoryLocked(
+                f"{path.dirname(self.filepath)} is in use by another Clipboard Manager window or batch import"
+            )
+        self._file = file
+        debug(f"Locked app data directory {path.dirname(self.filepath)}")
+
+    # Closing the file releases the lock
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Persisted application 'state' & undo/redo history, each artifact read at most once per session
+class StateStore:
+    def __init__(self, app_data_dir: str, date: str) -> None:
+        # Day being restored, saved data from another day is discarded
+        self.date = date
+        self.state_path = path.join(app_data_dir, 'application_state_data.json')
+        self.log_path = path.join(app_data_dir, 'stacks_state.log')
+        self.legacy_path = path.join(app_data_dir, 'stacks_state.json')
+        # Date the loaded state was saved for, & whether that is 'date'
+        self.saved_date = None
+        self.current = False
+        # Reads per artifact
+        self.metrics = Metrics()
+
+    # Read 'application_state_data.json' once & validate its date, None if nothing was saved
+    def load(self) -> Optional[dict]:
+        if not path.exists(self.state_path):
+            debug(f"No saved application state at {self.state_path}")
+            return None
+        with open(self.state_path, 'r') as file:
+            state = load(file)
+        self.metrics.incr("reads.application_state")
+        self.saved_date = state.get('current_date', None)
+        self.current = self.saved_date == self.date
+        return state
+
+    # Check for today's saved history without replaying it
+    def history_pending(self, log: HistoryLog) -> bool:
+        self.metrics.incr("reads.history_date")
+        return log.peek_date() == self.date
+
+    # Stacks saved by the JSON dump of older versions, if they belong to today
+    def load_legacy_history(self) -> dict:
+        if path.exists(self.log_path) or not self.current or not path.exists(self.legacy_path):
+            return {}
+        with open(self.legacy_path, 'r') as file:
+            stacks_state = load(file)
+        self.metrics.incr("reads.legacy_history")
+        return stacks_state
@@ -1,8 +1,31 @@
+from logging import warning
 from tkinter import ttk
 
 
+# Switch to 'theme', Tk ships 'vista' on Windows so 'ttkthemes' (& Pillow) is only imported for themes it adds
+def apply_theme(root, theme: str) -> None:
+    style = ttk.Style(root)
+    if theme in style.theme_names():
+        style.theme_use(theme)
+        return
+    try:
+        from ttkthemes import ThemedStyle
+    except ImportError:
+        warning(f"Theme '{theme}' is not available, keeping '{style.theme_use()}'")
+        return
+    # 'vista' is Windows-only & unknown to 'ttkthemes' elsewhere, where 'set_theme' would raise 'TclError'
+    themed_style = ThemedStyle(root)
+    if theme not in themed_style.get_themes():
+        warning(f"Theme '{theme}' is not available on this platform, keeping '{style.theme_use()}'")
+        return
+    themed_style.set_theme(theme)
+
+
 # Initialize 'style' & set background color for frames & labels
 def style_gui(app) -> None:
+    # Apply theme before the custom styles, they are configured per theme
+    apply_theme(app.root, app.theme)
+
     # Create style object for the application
     app.style = ttk.Style()
 
@@ -0,0 +1,5 @@
+from os import path
+import sys
+
+# Modules live flat in 'ClipboardApp', import them the way the app does
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
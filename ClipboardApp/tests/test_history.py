@@ -0,0 +1,38 @@
+from engine import Engine, Scheduler
+from history import HistoryLog
+
+
+# Captures, duplicates, undo & redo through a headless engine, a new master every 3 captures
+def run_session(engine: Engine, events: int) -> None:
+    for i in range(events):
+        if i % 3 == 0:
+            engine.master_id = f"MASTER{i // 3:06d}"
+        engine.process_master_ids([f"ID{i:08d}"])
+        if i % 5 == 0:
+            engine.duplicate_last_entry()
+        if i % 7 == 0:
+            engine.undo()
+        if i % 14 == 0:
+            engine.redo()
+
+
+# Undo records replayed from the history log match the live ones, counter, last-entry & master 'after' values
+# included, & undoing a restarted session's history restores the counter
+def test_replayed_history_matches_live_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = Engine(Scheduler(), str(tmp_path / "data"))
+    engine.open()
+    run_session(engine, 300)
+
+    live = {"undo": engine.undo_stack.to_list(), "redo": engine.redo_stack.to_list()}
+    assert HistoryLog(engine.history_log.filepath, engine.history_log.date).replay() == live
+    counter = engine.master_id_counter
+    engine.close()
+
+    engine = Engine(Scheduler(), str(tmp_path / "data"))
+    engine.open()
+    assert engine.master_id_counter == counter
+    while engine.can_undo and engine.undo_stack or engine.history_pending:
+        engine.undo()
+    assert engine.master_id_counter == 0
+    engine.close()
@@ -0,0 +1,86 @@
+from engine import Engine, Scheduler
+from document import ApprovalsDocument
+from journal import Journal
+
+
+# Headless engine capturing under master 'MASTER', approvals file in the current directory
+def open_engine(data_dir) -> Engine:
+    engine = Engine(Scheduler(), str(data_dir))
+    engine.open()
+    engine.master_id = "MASTER"
+    return engine
+
+
+# Add a line to the approvals file the way an editor would, behind the app's back
+def edit_outside_app(filepath: str, after: str, line: str) -> None:
+    with open(filepath, "r") as file:
+        content = file.read()
+    with open(filepath, "w") as file:
+        file.write(content.replace(f"{after}\n", f"{after}\n{line}\n", 1))
+
+
+def read_entries(filepath: str) -> list:
+    with open(filepath, "r") as file:
+        return [line.rstrip("\n") for line in file if line.startswith("MASTER (")]
+
+
+def test_edit_during_debounce_keeps_pending_capture(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = open_engine(tmp_path / "data")
+    statuses = []
+    engine.on("status", statuses.append)
+
+    # A reaches the file, B waits in the materialize debounce when the file is edited
+    engine.process_master_ids(["A"])
+    engine.root.run_due(everything=True)
+    engine.process_master_ids(["B"])
+    assert engine.materialize_job is not None
+    edit_outside_app(engine.filepath, "MASTER (A)", "MASTER (MANUAL)")
+
+    engine.process_master_ids(["C"])
+    engine.root.run_due(everything=True)
+    assert read_entries(engine.filepath) == ["MASTER (A)", "MASTER (MANUAL)", "MASTER (B)", "MASTER (C)"]
+
+    # Undo finds B in the file instead of dropping its record
+    engine.undo()
+    engine.undo()
+    engine.root.run_due(everything=True)
+    assert read_entries(engine.filepath) == ["MASTER (A)", "MASTER (MANUAL)"]
+    assert statuses == []
+    engine.close()
+
+
+def test_edit_while_closed_keeps_unmaterialized_journal_records(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = open_engine(tmp_path / "data")
+    engine.process_master_ids(["A"])
+    engine.root.run_due(everything=True)
+    engine.process_master_ids(["B"])
+    filepath = engine.filepath
+
+    # Crash before the debounce: B is only in the journal
+    engine.journal.close()
+    engine.lock.release()
+    edit_outside_app(filepath, "MASTER (A)", "MASTER (MANUAL)")
+
+    engine = open_engine(tmp_path / "data")
+    engine.process_master_ids(["C"])
+    engine.close()
+    assert read_entries(filepath) == ["MASTER (A)", "MASTER (MANUAL)", "MASTER (B)", "MASTER (C)"]
+
+
+def test_replay_tracks_records_after_last_materialized(tmp_path):
+    journal = Journal(str(tmp_path / "day.journal"))
+    journal.snapshot(ApprovalsDocument().lines())
+    journal.add("APPROVALS", "MASTER (A)")
+    journal.materialized((1, 1))
+    journal.add("APPROVALS", "MASTER (B)")
+    journal.remove("APPROVALS", 0, "MASTER (A)")
+    assert [record["op"] for record in journal.pending()] == ["add", "remove"]
+    journal.close()
+
+    replayed = Journal(journal.filepath)
+    replayed.replay()
+    assert [(record["op"], record["text"]) for record in replayed.pending()] == [
+        ("add", "MASTER (B)"), ("remove", "MASTER (A)")
+    ]
@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+from os import chmod, path, stat
+from platform import system
+from subprocess import run
+from time import perf_counter, sleep
+import pytest
+from document import ApprovalsDocument
+from engine import Engine, Scheduler
+from writer import FileWriter, io_barrier
+
+
+# Hold 'filepath' open the way an editor locking it does, so writes to it fail until the block ends: a byte-range
+# lock on Windows, elsewhere a read-only file (immutable for root, who may write read-only files); skips the test
+# where neither stops a write
+@contextmanager
+def held_open(filepath: str):
+    if system() == "Windows":
+        from msvcrt import locking, LK_NBLCK, LK_UNLCK
+        size = max(path.getsize(filepath), 1)
+        with open(filepath, "r+") as file:
+            locking(file.fileno(), LK_NBLCK, size)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                locking(file.fileno(), LK_UNLCK, size)
+        return
+
+    from os import geteuid
+    mode = stat(filepath).st_mode
+    chmod(filepath, 0o444)
+    immutable = False
+    try:
+        if geteuid() == 0:
+            immutable = run(["chattr", "+i", filepath], capture_output=True).returncode == 0
+        try:
+            with open(filepath, "a"):
+                pytest.skip(f"Can't hold {filepath} open on this system")
+        except PermissionError:
+            pass
+        yield
+    finally:
+        if immutable:
+            run(["chattr", "-i", filepath], capture_output=True)
+        chmod(filepath, mode)
+
+
+def saved_approvals(filepath: str) -> list:
+    with open(filepath, "r") as file:
+        return ApprovalsDocument.parse(file.readlines()).entries("APPROVALS")
+
+
+# Captures through the engine & writer thread while the approvals file is held open: capture latency stays
+# bounded & every entry reaches the file once it's released, without another capture
+def test_captures_while_file_is_held_are_not_lost_or_delayed(tmp_path, monkeypatch):
+    captures, locked_for, max_capture_ms = 100, 1.0, 50.0
+    monkeypatch.chdir(tmp_path)
+    scheduler = Scheduler()
+    engine = Engine(scheduler, str(tmp_path / "data"), FileWriter())
+    engine.materialize_delay = 100
+    statuses = []
+    engine.on("status", statuses.append)
+    engine.master_id = "MASTER"
+
+    try:
+        # Create the file, then hold it like an editor would
+        engine.process_master_ids(["ID-BEFORE"])
+        scheduler.run_due(everything=True)
+        io_barrier(engine)
+        ids = ["ID-BEFORE"] + [f"ID{i:08d}" for i in range(captures)]
+        latencies = []
+        with held_open(engine.filepath):
+            # Captures over the first half of the hold, then only the debounced rewrites of the file
+            held_until = perf_counter() + locked_for
+            for unique_id in ids[1:]:
+                start = perf_counter()
+                engine.process_master_ids([unique_id])
+                scheduler.run_due()
+                latencies.append((perf_counter() - start) * 1000)
+                sleep(locked_for / 2 / captures)
+            while perf_counter() < held_until:
+                scheduler.run_due()
+                sleep(0.01)
+            io_barrier(engine)
+            assert saved_approvals(engine.filepath) == ["MASTER (ID-BEFORE)"]
+
+        # Released: the rescheduled rewrite catches up on its own
+        start = perf_counter()
+        while len(saved_approvals(engine.filepath)) < len(ids) and perf_counter() - start < 5.0:
+            scheduler.run_due()
+            io_barrier(engine)
+            sleep(0.01)
+
+        assert saved_approvals(engine.filepath) == [f"MASTER ({unique_id})" for unique_id in ids]
+        assert max(latencies) <= max_capture_ms
+        assert statuses
+    finally:
+        engine.close()
+        engine.writer.stop()
@@ -0,0 +1,123 @@
+from logging import debug, error
+from queue import Empty, SimpleQueue
+from time import perf_counter
+from traceback import format_exc
+from typing import Any, Callable
+from metrics import Metrics
+
+
+# Producer/consumer hand-off from worker threads to the Tk thread: workers only 'put',
+# the Tk main loop drains the queue in batches via 'root.after' & runs 'handler' on each item,
+# or once on the whole batch when 'batched' (items arriving within one interval are coalesced).
+# With an 'idle_interval' an idle queue is drained less & less often, up to every 'idle_interval' ms, so it doesn't
+# keep waking Tk; the first item after idle then waits up to that long, since a worker can't call into Tk to wake
+# the drain. Queues whose latency is part of a bound (the capture window) don't back off, they only run while needed.
+# The queue is unbounded on purpose: items are captured IDs (one per clipboard change, payloads capped & filtered)
+# & writer completions (one per command the Tk thread submitted), a drain handles 64 per interval, far more than
+# either produces; dropping would lose approvals & blocking would only move the backlog to the clipboard
+class UiQueue:
+    def __init__(self, root, handler: Callable[[Any], None], interval: int = 20, batch_size: int = 64,
+                 batched: bool = False, idle_interval: int = 0) -> None:
+        self.root = root
+        self.handler = handler
+        self.batched = batched
+        # Drain period (ms) & most items handled per drain, so a burst can't freeze the window
+        self.interval = interval
+        self.batch_size = batch_size
+        # Longest drain period (ms) once idle, 0 never backs off, & the current one
+        self.idle_interval = max(idle_interval, interval)
+        self._delay = interval
+        # Items paired with the time they were queued
+        self._queue = SimpleQueue()
+        self._job = None
+        # Queue depth, batch sizes & queue-to-handled latency
+        self.metrics = Metrics()
+
+    # Queue 'item' for the Tk thread, safe from any thread
+    def put(self, item: Any) -> None:
+        self._queue.put((item, perf_counter()))
+        self.metrics.incr("queued")
+        self.metrics.observe("depth", self._queue.qsize())
+
+    # Start draining on the Tk thread
+    def start(self) -> None:
+        if self._job is None:
+            self._job = self.root.after(self.interval, self.drain)
+
+    # Handle up to 'batch_size' queued items on the Tk thread, then schedule the next drain
+    def drain(self) -> int:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+
+        items = [item for item, _ in batch]
+        for item in ([items] if self.batched and items else items):
+            try:
+                self.handler(item)
+            except Exception as e:
+                error(f"An exception occurred while handling a queued UI update: {e}")
+                error(format_exc())
+
+        now = perf_counter()
+        for _, queued in batch:
+            self.metrics.observe("latency_ms", (now - queued) * 1000)
+        handled = len(batch)
+
+        if handled:
+            self.metrics.observe("batch", handled)
+            debug(f"Drained {handled} queued UI updates")
+            self._delay = self.interval
+        else:
+            # Nothing queued, back off until items arrive again
+            self._delay = min(self._delay * 2, self.idle_interval)
+        self.metrics.incr("drains")
+        # Batch was full, come back right after pending Tk events instead of waiting a whole interval
+        if self._job is not None:
+            self._job = self.root.after(1 if handled == self.batch_size else self._delay, self.drain)
+        return handled
+
+    # Stop draining & handle whatever is still queued
+    def stop(self) -> None:
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        while self.drain():
+            pass
+
+
+# Tk event loop stall meter: a tick scheduled every 'interval' ms that runs late means the loop was blocked;
+# it wakes Tk on every tick, so it's for benchmarks & debugging only
+class StallMonitor:
+    def __init__(self, root, interval: int = 50, threshold: float = 100.0) -> None:
+        self.root = root
+        self.interval = interval
+        # Lateness (ms) counted as a stall
+        self.threshold = threshold
+        self._expected = None
+        self._job = None
+        # Tick lateness & stall counts
+        self.metrics = Metrics()
+
+    def start(self) -> None:
+        if self._job is None:
+            self._expected = perf_counter() + self.interval / 1000
+            self._job = self.root.after(self.interval, self._tick)
+
+    # Measure how late this tick ran, then schedule the next one
+    def _tick(self) -> None:
+        now = perf_counter()
+        late = max(0.0, (now - self._expected) * 1000)
+        self.metrics.observe("late_ms", late)
+        if late > self.threshold:
+            self.metrics.incr("stalls")
+            debug(f"Tk event loop stalled for {late:.0f} ms")
+        self._expected = now + self.interval / 1000
+        self._job = self.root.after(self.interval, self._tick)
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
@@ -1,12 +1,22 @@
-from os import getcwd, chdir, startfile
 from logging import info, warning, error, debug
 from traceback import format_exc
-from tkinter import END, messagebox, filedialog
+from tkinter import NORMAL
+from time import monotonic
+from typing import Optional
+from journal import materialize
 
 
 # Open working file
-def open_file() -> None:
+def open_file(app) -> None:
+    # Regenerate approvals file from the journal, the dialog opens once the writer wrote it so the editor sees
+    # every entry; the Tk thread never waits on a locked or slow file
+    materialize(app.engine, on_done=lambda written: choose_and_open_file(app))
+
+
+# Pick a file & open it in the native text editor
+def choose_and_open_file(app) -> None:
     # Open file dialog & get the 'file_path'
+    from tkinter import filedialog
     file_path = filedialog.askopenfilename(
         title="Select a file",
         filetypes=(("Text files", "*.txt"), ("All files", "*.*"))
@@ -15,6 +25,8 @@ def open_file() -> None:
     # Open selected file locally in native text editor
     if file_path:
         try:
+            # Windows-only, imported when a file is opened
+            from os import startfile
             startfile(file_path)
 
         except (OSError, IOError) as e:
@@ -33,33 +45,61 @@ def open_file() -> None:
 
 # Append processed ID's to text display
 def update_text_display(app, text: str) -> None:
-    # Insert 'text' into 'text_display' widget
-    app.text_display.insert(END, text + "\n", "center")
-
-    # Scroll to end of 'text_display'
-    app.text_display.see(index=END)
+    # Insert 'text' into 'text_display' widget & scroll to its end
+    app.display.append([text])
 
 
 # Update current working directory label
 def update_directory_label(app) -> None:
-    app.working_directory = getcwd()
-    app.dir_label.config(text=app.working_directory)
+    app.dir_label.config(text=app.engine.working_directory)
 
 
 # Update counter label for unique master IDs
 def update_counter_label(app) -> None:
-    app.counter_label.config(text=f"Unique Master ID count: {app.master_id_counter}")
+    app.counter_label.config(text=f"Unique Master ID count: {app.engine.master_id_counter}")
+
+
+# Show 'message' next to the listening status for 'duration' ms, e.g. an undo that had nothing left to remove
+def show_status(app, message: str, duration: int = 5000) -> None:
+    # One line, whatever the clipboard held
+    message = " ".join(message.split())
+    app.status_message.config(text=message if len(message) <= 60 else message[:59] + "…")
+    if app.status_job is not None:
+        app.root.after_cancel(app.status_job)
+    app.status_job = app.root.after(duration, clear_status, app)
+
+
+def clear_status(app) -> None:
+    app.status_job = None
+    app.status_message.config(text="")
+
+
+# Enable Duplicate Entry button once there is an entry to duplicate
+def update_duplicate_button(app, entry: Optional[str]) -> None:
+    if entry is not None:
+        app.duplicate_entry_button.config(state=NORMAL)
 
 
 # Grab, set, check, strip, 'master_id' entry
 def set_master_id(app) -> None:
     # Get 'master_id' from entry field & strip whitespace
-    app.master_id = app.master_id_entry.get().strip()
+    app.engine.master_id = app.master_id_entry.get().strip()
 
     # Check if 'master_id' is empty & show warning if needed
-    if not app.master_id:
+    if not app.engine.master_id:
+        from tkinter import messagebox
         messagebox.showwarning("No Master ID", "Please enter a Master ID.")
         warning("No Master ID entered")
     else:
         # Log the 'master_id' that was set
-        info(f"Master ID set to: {app.master_id}")
+        info(f"Master ID set to: {app.engine.master_id}")
+
+
+# Tell the user approvals file writes are failing, at most once a minute
+def show_write_error(app, exception: Exception) -> None:
+    warning(f"File write failed: {exception}")
+    if monotonic() - app.last_write_error < 60:
+        return
+    app.last_write_error = monotonic()
+    from tkinter import messagebox
+    messagebox.showwarning("File write failed", f"Could not save your changes:\n{exception}")
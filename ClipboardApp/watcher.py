@@ -0,0 +1,330 @@
+from ctypes import CDLL, CFUNCTYPE, byref, c_char_p, c_int, c_long, c_void_p
+from ctypes.util import find_library
+from functools import lru_cache
+from logging import info, debug, warning
+from select import select
+from threading import Event, Lock
+from platform import system
+from typing import Callable, Optional, Tuple
+from metrics import Metrics
+from readers import ClipboardReader, PyperclipReader
+from x11 import load_xlib, new_event, x11_available, XFixesSelectionNotifyEvent
+
+
+# Cheap change-detection key for clipboard payloads (length plus hash)
+def fingerprint(content: str) -> Tuple[int, int]:
+    return len(content), hash(content)
+
+
+# Clipboard sequence number, bumped by the OS on every change: 'GetClipboardSequenceNumber' on Windows,
+# the pasteboard's 'changeCount' on macOS; None elsewhere, where each poll reads & hashes the whole payload (O(n))
+def clipboard_sequence() -> Optional[int]:
+    if system() == "Windows":
+        from ctypes import windll
+        return windll.user32.GetClipboardSequenceNumber()
+    if system() == "Darwin":
+        change_count = load_change_count()
+        return change_count() if change_count is not None else None
+    return None
+
+
+# '[[NSPasteboard generalPasteboard] changeCount]' through the Objective-C runtime, loaded once; None without it
+@lru_cache(maxsize=None)
+def load_change_count() -> Optional[Callable[[], int]]:
+    if find_library("objc") is None or find_library("AppKit") is None:
+        return None
+    objc = CDLL(find_library("objc"))
+    # Loading AppKit registers the 'NSPasteboard' class
+    CDLL(find_library("AppKit"))
+    objc.objc_getClass.restype = c_void_p
+    objc.objc_getClass.argtypes = [c_char_p]
+    objc.sel_registerName.restype = c_void_p
+    objc.sel_registerName.argtypes = [c_char_p]
+
+    # 'objc_msgSend' typed once per return type so 64-bit pointers & NSInteger aren't truncated
+    send_object = CFUNCTYPE(c_void_p, c_void_p, c_void_p)(("objc_msgSend", objc))
+    send_integer = CFUNCTYPE(c_long, c_void_p, c_void_p)(("objc_msgSend", objc))
+    pasteboard = send_object(objc.objc_getClass(b"NSPasteboard"), objc.sel_registerName(b"generalPasteboard"))
+    if not pasteboard:
+        return None
+    selector = objc.sel_registerName(b"changeCount")
+    return lambda: send_integer(pasteboard, selector)
+
+
+# Common interface for clipboard watcher backends used by 'check_clipboard'
+class ClipboardWatcher:
+    name = "base"
+
+    def __init__(self, reader: Optional[ClipboardReader] = None) -> None:
+        # Set when 'stop' is called so blocked waits return immediately
+        self._stopped = Event()
+        # Wakeup, change & read counters for this backend
+        self.metrics = Metrics()
+        # Reader used to fetch clipboard text once a change is reported
+        self.reader = reader or PyperclipReader()
+
+    # Check if backend can run on this machine
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    # Check if watcher has not been stopped
+    @property
+    def active(self) -> bool:
+        return not self._stopped.is_set()
+
+    # Block until clipboard may have changed, return False on timeout or stop
+    def wait(self, timeout: float) -> bool:
+        raise NotImplementedError
+
+    # Read current clipboard text through the configured reader
+    def read(self) -> str:
+        self.metrics.incr("reads")
+        return self.reader.read()
+
+    # Wake any blocked 'wait' & stop watching
+    def stop(self) -> None:
+        self._stopped.set()
+
+    # Release backend resources, called from the watcher thread
+    def close(self) -> None:
+        self.reader.close()
+
+
+# Poll interval that tightens after a change & decays exponentially while the clipboard is idle
+class AdaptivePollScheduler:
+    def __init__(self, min_interval: float = 0.02, max_interval: float = 0.25, decay: float = 1.25) -> None:
+        # Fastest interval used right after a change
+        self.min_interval = min_interval
+        # Ceiling reached after a long idle stretch
+        self.max_interval = max_interval
+        # Growth factor applied on every idle wakeup
+        self.decay = decay
+        # Current interval, start fast so the first copy is caught quickly
+        self.interval = min_interval
+        # Wakeup counters & time spent sleeping
+        self.wakeups = 0
+        self.idle_wakeups = 0
+        self.changes = 0
+        self.slept = 0.0
+
+    # Clipboard changed, tighten interval for the burst that usually follows
+    def on_change(self) -> None:
+        self.wakeups += 1
+        self.changes += 1
+        self.interval = self.min_interval
+
+    # Nothing changed, back off exponentially up to the ceiling
+    def on_idle(self) -> None:
+        self.wakeups += 1
+        self.idle_wakeups += 1
+        self.interval = min(self.max_interval, self.interval * self.decay)
+
+    # Current interval & wakeup counts, to confirm CPU savings over a shift
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "wakeups": self.wakeups,
+            "idle_wakeups": self.idle_wakeups,
+            "changes": self.changes,
+            "slept": round(self.slept, 3),
+        }
+
+
+# Fallback backend that re-reads the clipboard on an adaptive schedule
+class PollingWatcher(ClipboardWatcher):
+    name = "poll"
+
+    def __init__(self, scheduler: Optional[AdaptivePollScheduler] = None,
+                 reader: Optional[ClipboardReader] = None) -> None:
+        super().__init__(reader)
+        self.scheduler = scheduler or AdaptivePollScheduler()
+        # Fingerprint of the previous poll, to feed the scheduler
+        self._last_fingerprint = None
+        # Clipboard sequence number of the previous poll, where the OS provides one
+        self._last_sequence = None
+
+    def wait(self, timeout: float) -> bool:
+        # Sleep for the scheduled interval unless stopped in the meantime
+        interval = self.scheduler.interval
+        self.scheduler.slept += interval
+        self.metrics.incr("wakeups")
+        if self._stopped.wait(interval):
+            return False
+
+        # Skip the read entirely while the OS sequence number hasn't moved
+        sequence = clipboard_sequence()
+        if sequence is not None:
+            if sequence == self._last_sequence:
+                self.metrics.incr("unchanged")
+                self.scheduler.on_idle()
+                return False
+            self._last_sequence = sequence
+        return True
+
+    def read(self) -> str:
+        content = super().read()
+
+        # Tighten or back off depending on whether the clipboard moved
+        current = fingerprint(content)
+        if current != self._last_fingerprint:
+            self.scheduler.on_change()
+            self._last_fingerprint = current
+        else:
+            self.scheduler.on_idle()
+        return content
+
+
+# Backend that sleeps until the X11 CLIPBOARD owner changes (XFixes selection notify)
+class X11Watcher(ClipboardWatcher):
+    name = "x11"
+
+    # 'XFixesSetSelectionOwnerNotifyMask' & 'XFixesSelectionNotify' event offset
+    SET_SELECTION_OWNER_NOTIFY_MASK = 1
+    SELECTION_NOTIFY = 0
+
+    def __init__(self, reader: Optional[ClipboardReader] = None) -> None:
+        super().__init__(reader)
+        # Load libX11 & libXfixes
+        self._xlib, self._xfixes = load_xlib()
+
+        # Open own display connection, Tk's connection belongs to the main thread
+        self._display = self._xlib.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("Cannot open X display")
+
+        # Check XFixes extension & grab its event base
+        event_base, error_base = c_int(), c_int()
+        if not self._xfixes.XFixesQueryExtension(self._display, byref(event_base), byref(error_base)):
+            self._xlib.XCloseDisplay(self._display)
+            raise OSError("XFixes extension not available")
+        self._notify_type = event_base.value + self.SELECTION_NOTIFY
+
+        # Subscribe to CLIPBOARD owner changes on the root window
+        root = self._xlib.XDefaultRootWindow(self._display)
+        self._clipboard_atom = self._xlib.XInternAtom(self._display, b"CLIPBOARD", 0)
+        self._xfixes.XFixesSelectSelectionInput(
+            self._display, root, self._clipboard_atom, self.SET_SELECTION_OWNER_NOTIFY_MASK
+        )
+        self._xlib.XFlush(self._display)
+
+        # File descriptor of the X connection for 'select'
+        self._fd = self._xlib.XConnectionNumber(self._display)
+
+        # Guard display against concurrent 'close'
+        self._lock = Lock()
+
+    @classmethod
+    def available(cls) -> bool:
+        return x11_available()
+
+    def wait(self, timeout: float) -> bool:
+        # Wait in short slices so 'stop' is honoured promptly
+        while self.active:
+            changed = self._drain_events()
+            if changed:
+                return True
+
+            # Sleep on the X connection until an event arrives or the slice expires
+            readable, _, _ = select([self._fd], [], [], min(timeout, 0.25))
+            self.metrics.incr("wakeups")
+            if not readable:
+                timeout -= 0.25
+                if timeout <= 0:
+                    return False
+        return False
+
+    # Consume queued X events, return True if CLIPBOARD owner changed
+    def _drain_events(self) -> bool:
+        changed = False
+        event = new_event()
+        with self._lock:
+            if not self._display:
+                return False
+            while self._xlib.XPending(self._display):
+                self._xlib.XNextEvent(self._display, event)
+                notify = XFixesSelectionNotifyEvent.from_buffer(event)
+                if notify.type == self._notify_type and notify.selection == self._clipboard_atom:
+                    self.metrics.incr("changes")
+                    changed = True
+        return changed
+
+    def close(self) -> None:
+        super().close()
+        with self._lock:
+            if self._display:
+                self._xlib.XCloseDisplay(self._display)
+                self._display = None
+
+
+# Test double that fires synthetic clipboard changes for headless throughput & loss measurement
+class FakeWatcher(ClipboardWatcher):
+    name = "fake"
+
+    def __init__(self, reader: Optional[ClipboardReader] = None) -> None:
+        super().__init__(reader)
+        # Current synthetic clipboard content
+        self._content = ""
+        # Set when content changed & has not been read yet
+        self._changed = Event()
+        self._lock = Lock()
+
+    # Replace clipboard content with 'text', like a user copy
+    def fire(self, text: str) -> None:
+        with self._lock:
+            # An unread change is overwritten, exactly like a real clipboard
+            if self._changed.is_set():
+                self.metrics.incr("lost")
+            self._content = text
+            self._changed.set()
+            self.metrics.incr("fired")
+
+    def wait(self, timeout: float) -> bool:
+        self.metrics.incr("wakeups")
+        if not self._changed.wait(timeout):
+            return False
+        return self.active
+
+    def read(self) -> str:
+        with self._lock:
+            self._changed.clear()
+            self.metrics.incr("reads")
+            return self._content
+
+    def stop(self) -> None:
+        super().stop()
+        # Unblock a pending 'wait'
+        self._changed.set()
+
+
+# Backends in the order 'auto' tries them
+WATCHERS = {
+    X11Watcher.name: X11Watcher,
+    PollingWatcher.name: PollingWatcher,
+    FakeWatcher.name: FakeWatcher,
+}
+
+
+# Pick & construct a clipboard watcher for 'backend' ('auto' prefers event-driven backends)
+def select_watcher(backend: str = "auto", scheduler: Optional[AdaptivePollScheduler] = None,
+                   reader: Optional[ClipboardReader] = None) -> ClipboardWatcher:
+    if backend == PollingWatcher.name:
+        return PollingWatcher(scheduler, reader)
+    if backend != "auto":
+        watcher = WATCHERS[backend](reader)
+        info(f"Clipboard watcher backend: {watcher.name}")
+        return watcher
+
+    if X11Watcher.available():
+        try:
+            watcher = X11Watcher(reader)
+            info(f"Clipboard watcher backend: {watcher.name}")
+            return watcher
+        except OSError as e:
+            warning(f"Clipboard watcher backend {X11Watcher.name} failed, falling back: {e}")
+    else:
+        debug(f"Clipboard watcher backend unavailable: {X11Watcher.name}")
+
+    # Polling always works where 'pyperclip' does
+    info(f"Clipboard watcher backend: {PollingWatcher.name}")
+    return PollingWatcher(scheduler, reader)
@@ -0,0 +1,119 @@
+from collections import deque
+from functools import partial
+from logging import debug, error
+from threading import Condition, Thread
+from time import perf_counter
+from traceback import format_exc
+from typing import Callable, Optional
+from metrics import Metrics
+
+
+# Single thread owning approvals file & journal I/O: commands run one at a time in submission order,
+# results & failures are reported back to the Tk thread through 'completions'
+class FileWriter:
+    def __init__(self, completions=None, on_error: Optional[Callable[[Exception], None]] = None) -> None:
+        # 'UiQueue' running callbacks on the Tk thread, callbacks run on the writer thread without one
+        self.completions = completions
+        self.on_error = on_error
+        # Commands as (command, args, on_done, queued time)
+        self._commands = deque()
+        # Commands queued or running, 0 once every submitted command finished
+        self._pending = 0
+        self._stopped = False
+        self._condition = Condition()
+        # Queue depth, wait & run times & failures
+        self.metrics = Metrics()
+        self._thread = Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    # Check for unfinished commands
+    @property
+    def busy(self) -> bool:
+        return self._pending > 0
+
+    # Queue 'command(*args)', 'on_done' gets its result on the Tk thread
+    def submit(self, command: Callable, *args, on_done: Optional[Callable] = None) -> None:
+        with self._condition:
+            self._commands.append((command, args, on_done, perf_counter()))
+            self._pending += 1
+            self.metrics.observe("depth", len(self._commands))
+            self._condition.notify_all()
+
+    # Wait until every command submitted so far has run, return False on timeout
+    def barrier(self, timeout: Optional[float] = None) -> bool:
+        start = perf_counter()
+        with self._condition:
+            done = self._condition.wait_for(lambda: self._pending == 0, timeout)
+        self.metrics.observe("barrier_ms", (perf_counter() - start) * 1000)
+        return done
+
+    # Run queued commands until stopped
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._commands and not self._stopped:
+                    self._condition.wait()
+                if not self._commands:
+                    return
+                command, args, on_done, queued = self._commands.popleft()
+
+            start = perf_counter()
+            self.metrics.observe("wait_ms", (start - queued) * 1000)
+            try:
+                result = command(*args)
+                self.metrics.incr("commands")
+                if on_done is not None:
+                    self._report(partial(on_done, result))
+
+            except (OSError, IOError) as e:
+                self.metrics.incr("failures")
+                error(f"An exception occurred in the file writer: {e}")
+                error(format_exc())
+                if self.on_error is not None:
+                    self._report(partial(self.on_error, e))
+
+            except Exception as e:
+                self.metrics.incr("failures")
+                error(f"An unexpected exception occurred in the file writer: {e}")
+                error(format_exc())
+
+            self.metrics.observe("run_ms", (perf_counter() - start) * 1000)
+            with self._condition:
+                self._pending -= 1
+                self._condition.notify_all()
+
+    # Hand 'callback' to the Tk thread
+    def _report(self, callback: Callable) -> None:
+        if self.completions is not None:
+            self.completions.put(callback)
+        else:
+            callback()
+
+    # Run remaining commands & stop the thread
+    def stop(self, timeout: float = 5.0) -> None:
+        self.barrier(timeout)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        debug(f"File writer stopped: {self.metrics.snapshot()}")
+
+
+# Run file I/O on the app's writer thread, or inline when there is none (headless use)
+def submit_io(app, command: Callable, *args, on_done: Optional[Callable] = None) -> None:
+    if app.writer is None:
+        result = command(*args)
+        if on_done is not None:
+            on_done(result)
+        return
+    app.writer.submit(command, *args, on_done=on_done)
+
+
+# Check for approvals file I/O still queued or running
+def io_busy(app) -> bool:
+    return app.writer is not None and app.writer.busy
+
+
+# Wait for queued approvals file I/O, e.g. before the file is opened or the app closes
+def io_barrier(app, timeout: Optional[float] = None) -> bool:
+    return app.writer is None or app.writer.barrier(timeout)
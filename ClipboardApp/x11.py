@@ -0,0 +1,90 @@
+from ctypes import CDLL, POINTER, Structure, c_char_p, c_int, c_long, c_ubyte, c_uint, c_ulong, c_void_p
+from ctypes.util import find_library
+from os import environ
+from platform import system
+from typing import Tuple
+
+
+# Xlib constants used by the clipboard watcher & reader
+CURRENT_TIME = 0
+ANY_PROPERTY_TYPE = 0
+SELECTION_NOTIFY = 31
+PROPERTY_NEW_VALUE = 0
+
+
+# ctypes mirror of Xlib's 'XFixesSelectionNotifyEvent'
+class XFixesSelectionNotifyEvent(Structure):
+    _fields_ = [
+        ("type", c_int),
+        ("serial", c_ulong),
+        ("send_event", c_int),
+        ("display", c_void_p),
+        ("window", c_ulong),
+        ("subtype", c_int),
+        ("owner", c_ulong),
+        ("selection", c_ulong),
+        ("timestamp", c_ulong),
+        ("selection_timestamp", c_ulong),
+    ]
+
+
+# ctypes mirror of Xlib's 'XSelectionEvent'
+class XSelectionEvent(Structure):
+    _fields_ = [
+        ("type", c_int),
+        ("serial", c_ulong),
+        ("send_event", c_int),
+        ("display", c_void_p),
+        ("requestor", c_ulong),
+        ("selection", c_ulong),
+        ("target", c_ulong),
+        ("property", c_ulong),
+        ("time", c_ulong),
+    ]
+
+
+# Fresh 'XEvent' buffer, a union padded to 24 longs
+def new_event():
+    return (c_long * 24)()
+
+
+# Check for an X display & the shared libraries needed by the X11 backends
+def x11_available() -> bool:
+    return system() == "Linux" and bool(environ.get("DISPLAY")) and \
+        find_library("X11") is not None and find_library("Xfixes") is not None
+
+
+# Load libX11 & libXfixes with prototypes declared so 64-bit pointers aren't truncated
+def load_xlib() -> Tuple[CDLL, CDLL]:
+    xlib = CDLL(find_library("X11"))
+    xfixes = CDLL(find_library("Xfixes"))
+
+    xlib.XOpenDisplay.argtypes = [c_char_p]
+    xlib.XOpenDisplay.restype = c_void_p
+    xlib.XCloseDisplay.argtypes = [c_void_p]
+    xlib.XDefaultRootWindow.argtypes = [c_void_p]
+    xlib.XDefaultRootWindow.restype = c_ulong
+    xlib.XInternAtom.argtypes = [c_void_p, c_char_p, c_int]
+    xlib.XInternAtom.restype = c_ulong
+    xlib.XFlush.argtypes = [c_void_p]
+    xlib.XConnectionNumber.argtypes = [c_void_p]
+    xlib.XPending.argtypes = [c_void_p]
+    xlib.XNextEvent.argtypes = [c_void_p, c_void_p]
+    xlib.XCreateSimpleWindow.argtypes = [
+        c_void_p, c_ulong, c_int, c_int, c_uint, c_uint, c_uint, c_ulong, c_ulong
+    ]
+    xlib.XCreateSimpleWindow.restype = c_ulong
+    xlib.XDestroyWindow.argtypes = [c_void_p, c_ulong]
+    xlib.XConvertSelection.argtypes = [c_void_p, c_ulong, c_ulong, c_ulong, c_ulong, c_ulong]
+    xlib.XGetWindowProperty.argtypes = [
+        c_void_p, c_ulong, c_ulong, c_long, c_long, c_int, c_ulong,
+        POINTER(c_ulong), POINTER(c_int), POINTER(c_ulong), POINTER(c_ulong), POINTER(POINTER(c_ubyte))
+    ]
+    xlib.XFree.argtypes = [c_void_p]
+    xlib.XGetSelectionOwner.argtypes = [c_void_p, c_ulong]
+    xlib.XGetSelectionOwner.restype = c_ulong
+
+    xfixes.XFixesQueryExtension.argtypes = [c_void_p, POINTER(c_int), POINTER(c_int)]
+    xfixes.XFixesSelectSelectionInput.argtypes = [c_void_p, c_ulong, c_ulong, c_ulong]
+
+    return xlib, xfixes